@@ -1,7 +1,18 @@
 import time
 import os
-import heapq
-import tracemalloc  # ✅ Thêm thư viện đo bộ nhớ
+
+import bidirectional
+import cost_models
+import hda_star
+import ida_star
+import numpy_bfs
+import portfolio
+import solution_cache
+import solver_core
+import symmetry
+from heuristics import HEURISTICS
+from level_analysis import Level
+from search_stats import DEFAULT_INTERVAL, BudgetExceeded, SearchStats, peak_rss_kb
 
 # Biến toàn cục lưu bản đồ game
 game_map = []
@@ -11,6 +22,8 @@ class GameState:
     """
     Lớp đại diện cho một trạng thái trong game Sokoban
     Mỗi trạng thái bao gồm vị trí người chơi và vị trí các hộp
+    Trạng thái con được sinh trên dạng gọn trong solver_core (move_successors,
+    push_successors), đã loại các lần đẩy hộp vào ô chết (Level.dead)
     """
     
     def __init__(self, player, boxes, cost=0, heuristic=0):
@@ -35,195 +48,250 @@ class GameState:
         """So sánh nhỏ hơn: dùng cho hàng đợi ưu tiên trong A*"""
         return (self.cost + self.heuristic) < (other.cost + other.heuristic)
 
-    def generate_state(self):
+
+class Solver:
+    """Lớp chứa các thuật toán giải game Sokoban"""
+
+    def __init__(self):
+        # Thông tin tĩnh của level hiện tại (bản đồ làm phẳng, bảng Zobrist)
+        self.level = None
+        # Thống kê của lần giải gần nhất (search_stats.SearchStats) và cấu hình đo đạc
+        self.stats = None
+        self.stats_options = {}
+        # Kết quả của lần chạy đua gần nhất (portfolio.RaceResult)
+        self.race_result = None
+        # Các lời giải tốt dần của lần anytime A* gần nhất: (chi phí, weight, số nút, giây)
+        self.anytime_solutions = []
+        # Chuỗi di chuyển của lần giải gần nhất (None nếu không có lời giải)
+        self.moves = None
+        # Bộ nhớ đệm lời giải trên đĩa (solution_cache.SolutionCache), None = không dùng
+        self.cache = None
+        self.cache_hit = False
+        # Ngân sách cho mỗi lần giải (search_stats.Budget), None = không giới hạn
+        self.budget = None
+        # Lý do lần giải gần nhất bị dừng sớm ("cancelled", "time limit (...)"...), None nếu chạy hết
+        self.exceeded = None
+
+    def get_level(self, goal):
+        """Lấy Level cho bản đồ hiện tại, chỉ phân tích lại khi đổi bản đồ hoặc goal"""
+        if self.level is None or self.level.base_map is not game_map or self.level.goals != goal:
+            self.level = Level(game_map, goal)
+        return self.level
+
+    def instrument(self, timing=False, callback=None, interval=DEFAULT_INTERVAL):
         """
-        Sinh ra các trạng thái kế tiếp từ trạng thái hiện tại
-        Trả về danh sách các trạng thái con hợp lệ
+        Cấu hình đo đạc cho các lần giải sau (xem search_stats.py)
+        timing: đo thời gian sinh trạng thái con, heuristic, heap, dựng lời giải
+        callback(stats): được gọi sau mỗi interval nút mở rộng
+        Mặc định tắt hết, chỉ còn các bộ đếm gần như không tốn chi phí
         """
-        # 4 hướng di chuyển: Lên, Xuống, Trái, Phải
-        moves = [(0, -1), (0, +1), (-1, 0), (+1, 0)]
-        child_state = []
-
-        for dx, dy in moves:
-            # Lấy vị trí hiện tại của người chơi
-            px, py = self.player
-            # Tính vị trí mới sau khi di chuyển
-            new_player = (px + dx, py + dy)
-
-            # Kiểm tra nếu vị trí mới là tường thì bỏ qua
-            if game_map[new_player[1]][new_player[0]] == "#":
-                continue
-
-            # TRƯỜNG HỢP 1: Di chuyển không đẩy hộp
-            if new_player not in self.boxes:
-                # Tạo trạng thái mới với vị trí người chơi mới, hộp giữ nguyên
-                child_state.append(GameState(new_player, self.boxes, self.cost + 1))
-            
-            # TRƯỜNG HỢP 2: Di chuyển đẩy hộp
-            else:
-                # Tính vị trí mới của hộp sau khi bị đẩy
-                new_box = (new_player[0] + dx, new_player[1] + dy)
-                
-                # Kiểm tra điều kiện đẩy hộp hợp lệ:
-                # - Vị trí mới của hộp không phải là tường
-                # - Vị trí mới của hộp không trùng với hộp khác
-                if game_map[new_box[1]][new_box[0]] != "#" and new_box not in self.boxes:
-                    # Tạo tập hợp hộp mới
-                    new_box_state = set(self.boxes)
-                    # Xóa vị trí hộp cũ (vị trí mà người chơi đang đẩy)
-                    new_box_state.remove(new_player)
-                    # Thêm vị trí hộp mới
-                    new_box_state.add(new_box)
-                    # Tạo trạng thái mới với vị trí người chơi và hộp đã cập nhật
-                    child_state.append(GameState(new_player, frozenset(new_box_state), self.cost + 1))
-
-        return child_state
+        self.stats_options = {"timing": timing, "callback": callback, "interval": interval}
 
+    def new_stats(self):
+        """Tạo bộ đếm cho lần giải mới, giữ ở self.stats để đọc sau khi giải xong"""
+        self.stats = SearchStats(budget=self.budget, **self.stats_options)
+        return self.stats
 
-class Solver:
-    """Lớp chứa các thuật toán giải game Sokoban"""
-    
-    def bfs(self, start_state, goal):
+    def search(self, start_state, run):
+        """
+        Gọi run(stats) với bộ đếm mới (theo ngân sách self.budget)
+        Trả về chuỗi di chuyển (U, D, L, R) hoặc None nếu không có lời giải;
+        danh sách GameState chỉ được dựng khi cần (moves_to_path)
+        Vượt ngân sách hoặc bị hủy: trả về None, lý do ghi ở self.exceeded,
+        self.stats giữ thống kê dở dang
+        """
+        self.exceeded = None
+        stats = self.new_stats()
+        try:
+            moves = run(stats)
+        except BudgetExceeded as exc:
+            self.exceeded = exc.reason
+            moves = None
+        return self.finish(moves)
+
+    def bfs(self, start_state, goal, push=False, macros=False):
         """
         Thuật toán Breadth-First Search (Tìm kiếm theo chiều rộng)
         Đảm bảo tìm được đường đi ngắn nhất về số bước
+        push=True: tìm trên không gian đẩy hộp, ít lần đẩy nhất
+        macros=True (cần push=True): gộp đẩy qua đường hầm / vào phòng goal thành macro move,
+        mở rộng ít nút hơn nhưng không còn đảm bảo ít lần đẩy nhất
+        Tìm kiếm chạy trên trạng thái gọn (solver_core.CompactState)
         """
-        # Hàng đợi cho BFS (First-In-First-Out)
-        q = [start_state]
-        # Dictionary lưu trạng thái cha để truy vết đường đi
-        parents = {start_state: None}
-
-        while q:
-            # Lấy trạng thái đầu tiên từ hàng đợi (FIFO)
-            state = q.pop(0)
-            
-            # Kiểm tra nếu đã đến trạng thái mục tiêu (tất cả hộp ở vị trí đích)
-            if state.boxes == goal:
-                # Truy vết đường đi từ goal về start
-                path = []
-                curr = state
-                while curr is not None:
-                    path.append(curr)
-                    curr = parents[curr]
-                # Đảo ngược để có đường đi từ start đến goal
-                path.reverse()
-                return path
-
-            # Duyệt qua tất cả trạng thái con từ trạng thái hiện tại
-            for child in state.generate_state():
-                # Nếu trạng thái con chưa được visited
-                if child not in parents:
-                    # Đánh dấu đã visited và lưu trạng thái cha
-                    parents[child] = state
-                    # Thêm vào hàng đợi
-                    q.append(child)
-        
-        # Không tìm thấy đường đi
-        return []
-
-    def a_star(self, start_state, goal):
+        level = self.get_level(goal)
+        return self.search(start_state, lambda stats: solver_core.bfs(
+            level, start_state.player, start_state.boxes, push, stats, macros))
+
+    def dfs(self, start_state, goal):
+        """
+        Thay cho DFS: IDA* (ida_star.py) theo số lần đẩy
+        Bộ nhớ tỉ lệ với độ sâu lời giải cộng một bảng chuyển vị kích thước cố định,
+        giải được level khó mà BFS / A* hết bộ nhớ; lời giải ít lần đẩy nhất
+        """
+        level = self.get_level(goal)
+        return self.search(start_state, lambda stats: ida_star.ida_star(
+            level, start_state.player, start_state.boxes, stats=stats))
+
+    def a_star(self, start_state, goal, push=False, heuristic="manhattan", macros=False):
         """
         Thuật toán A* Search (Tìm kiếm A*)
         Kết hợp chi phí thực tế và heuristic để tìm đường đi tối ưu
+        push=True: tìm trên không gian đẩy hộp, g(n) = số lần đẩy
+        heuristic: tên trong heuristics.HEURISTICS
+        - "manhattan": heuristic gốc, nhanh nhưng không đảm bảo tối ưu
+        - "matching": ghép cặp hộp - goal tối thiểu theo số lần đẩy, admissible
+          nên lời giải tối ưu (ít lần đẩy nhất khi push=True)
+        macros=True (cần push=True): dùng macro move như bfs(), g vẫn đếm từng lần đẩy
+        Tìm kiếm chạy trên trạng thái gọn (solver_core.CompactState)
         """
-        # Hàng đợi ưu tiên cho A* (ưu tiên trạng thái có f(n) nhỏ nhất)
-        open_set = []
-        heapq.heappush(open_set, (0, start_state))
-        
-        # Chi phí thực tế từ start đến trạng thái n (g(n))
-        g_score = {start_state: 0}
-        # Dictionary lưu trạng thái cha
-        parents = {start_state: None}
-        # Chuyển goal thành set để dễ xử lý
-        goal_positions = set(goal)
-
-        while open_set:
-            # Lấy trạng thái có f(n) nhỏ nhất từ hàng đợi ưu tiên
-            _, current = heapq.heappop(open_set)
-            
-            # Kiểm tra nếu đã đến trạng thái mục tiêu
-            if current.boxes == goal:
-                # Truy vết đường đi tương tự BFS
-                path = []
-                curr = current
-                while curr is not None:
-                    path.append(curr)
-                    curr = parents[curr]
-                path.reverse()
-                return path
-
-            # Duyệt qua các trạng thái con
-            for child in current.generate_state():
-                # Tính heuristic cho trạng thái con
-                child.heuristic = self.heuristic_func(child.boxes, goal_positions, child.player)
-                # Chi phí thực tế từ start đến child (g(child))
-                tentative_g_score = g_score[current] + 1
-
-                # Nếu tìm thấy đường đi tốt hơn đến child
-                if child not in g_score or tentative_g_score < g_score[child]:
-                    # Cập nhật chi phí thực tế
-                    g_score[child] = tentative_g_score
-                    child.cost = tentative_g_score
-                    # Lưu trạng thái cha
-                    parents[child] = current
-                    # Tính f(n) = g(n) + h(n)
-                    f_score = tentative_g_score + child.heuristic
-                    # Thêm vào hàng đợi ưu tiên
-                    heapq.heappush(open_set, (f_score, child))
-        
-        # Không tìm thấy đường đi
-        return []
-
-    def heuristic_func(self, boxes, goals, player):
+        level = self.get_level(goal)
+        return self.search(start_state, lambda stats: solver_core.a_star(
+            level, start_state.player, start_state.boxes, push, HEURISTICS[heuristic], stats, macros))
+
+    def anytime_a_star(self, start_state, goal, push=True, heuristic="matching", on_solution=None):
+        """
+        Anytime A* (solver_core.anytime_a_star): weighted A* với weight giảm dần
+        Lời giải đầu tiên có rất nhanh, sau đó mỗi lần tìm được lời giải ngắn hơn thì gọi
+        on_solution(chuỗi di chuyển, chi phí, weight); chi phí là số lần đẩy khi push=True
+        Trả về lời giải tốt nhất. Chạy hết (self.exceeded là None) với heuristic "matching"
+        nghĩa là lời giải đã được chứng minh tối ưu; hết ngân sách / bị hủy thì vẫn trả về
+        lời giải tốt nhất đã tìm được (None nếu chưa có), lý do ghi ở self.exceeded
+        """
+        level = self.get_level(goal)
+        self.anytime_solutions = []
+
+        def run(stats):
+            moves = None
+            start_time = time.perf_counter()
+            solutions = solver_core.anytime_a_star(
+                level, start_state.player, start_state.boxes, push, HEURISTICS[heuristic], stats)
+            try:
+                for moves, cost, weight in solutions:
+                    self.anytime_solutions.append((cost, weight, stats.expanded, time.perf_counter() - start_time))
+                    if on_solution is not None:
+                        on_solution(moves, cost, weight)
+            except BudgetExceeded as exc:
+                # Vẫn trả về lời giải tốt nhất đã có
+                self.exceeded = exc.reason
+            return moves
+
+        return self.search(start_state, run)
+
+    def optimal(self, start_state, goal, model="pushes-moves", heuristic="matching"):
+        """
+        Lời giải tối ưu theo mô hình chi phí (cost_models.py):
+        - "moves": ít bước nhất; "pushes": ít lần đẩy nhất
+        - "pushes-moves": ít lần đẩy nhất, cùng số lần đẩy thì ít bước nhất
+        - "moves-pushes": ít bước nhất, cùng số bước thì ít lần đẩy nhất
+        A* với heuristic admissible phù hợp từng mô hình (mặc định ghép cặp tối thiểu)
         """
-        Hàm heuristic ước tính chi phí từ trạng thái hiện tại đến goal
-        Sử dụng tổ hợp nhiều yếu tố để đánh giá
+        level = self.get_level(goal)
+        return self.search(start_state, lambda stats: cost_models.optimal_search(
+            level, start_state.player, start_state.boxes, model, HEURISTICS[heuristic], stats))
+
+    def bfs_vectorized(self, start_state, goal):
+        """
+        BFS theo từng lớp vector hóa bằng NumPy (numpy_bfs.py)
+        Cùng kết quả với bfs() theo từng bước nhưng mở rộng cả frontier một lần
         """
-        total_distance = 0
-        box_list = list(boxes)
-        goal_list = list(goals)
-        
-        # 1. Tổng khoảng cách Manhattan từ mỗi hộp đến điểm đích gần nhất
-        for box in box_list:
-            min_dist = float("inf")
-            for goal_pos in goal_list:
-                # Khoảng cách Manhattan: |x1-x2| + |y1-y2|
-                dist = abs(box[0] - goal_pos[0]) + abs(box[1] - goal_pos[1])
-                min_dist = min(min_dist, dist)
-            total_distance += min_dist
-
-        # 2. Phạt các trạng thái deadlock (bế tắc)
-        deadlock_penalty = 0
-        for box in box_list:
-            # Chỉ xét deadlock cho hộp chưa ở vị trí đích
-            if box not in goals:
-                x, y = box
-                if self.is_corner_deadlock(x, y):
-                    # Phạt nặng các trạng thái deadlock
-                    deadlock_penalty += 100
-
-        # 3. Khoảng cách từ người chơi đến hộp gần nhất
-        min_player_to_box = float("inf")
-        for box in box_list:
-            dist = abs(player[0] - box[0]) + abs(player[1] - box[1])
-            min_player_to_box = min(min_player_to_box, dist)
-
-        # Kết hợp tất cả yếu tố với trọng số
-        return total_distance + deadlock_penalty + min_player_to_box * 0.1
-
-    def is_corner_deadlock(self, x, y):
+        level = self.get_level(goal)
+        return self.search(start_state, lambda stats: numpy_bfs.bfs(
+            level, start_state.player, start_state.boxes, stats))
+
+    def bidirectional(self, start_state, goal):
         """
-        Kiểm tra xem hộp có rơi vào trạng thái deadlock ở góc không
-        Deadlock góc xảy ra khi hộp nằm ở góc tường
+        Tìm kiếm hai chiều (bidirectional.py): đẩy xuôi từ trạng thái đầu,
+        kéo ngược từ trạng thái đã giải, dừng khi hai frontier gặp nhau
+        Lời giải ít lần đẩy nhất, độ sâu mỗi chiều chỉ khoảng một nửa
         """
-        # Kiểm tra 4 trường hợp góc:
-        # - Góc trên-trái, trên-phải, dưới-trái, dưới-phải
-        if (game_map[y - 1][x] == "#" and game_map[y][x - 1] == "#") or \
-           (game_map[y - 1][x] == "#" and game_map[y][x + 1] == "#") or \
-           (game_map[y + 1][x] == "#" and game_map[y][x - 1] == "#") or \
-           (game_map[y + 1][x] == "#" and game_map[y][x + 1] == "#"):
-            return True
-        return False
+        level = self.get_level(goal)
+        return self.search(start_state, lambda stats: bidirectional.bidirectional(
+            level, start_state.player, start_state.boxes, stats))
+
+    def hda_star(self, start_state, goal, workers=None):
+        """
+        A* song song (hda_star.py): trạng thái được chia cho các tiến trình worker
+        theo khóa băm, mỗi worker có open list / bảng g riêng
+        Heuristic ghép cặp tối thiểu nên lời giải ít lần đẩy nhất
+        """
+        level = self.get_level(goal)
+        return self.search(start_state, lambda stats: hda_star.hda_star(
+            level, start_state.player, start_state.boxes, workers, stats))
+
+    def race(self, start_state, goal, timeout=None):
+        """
+        Chạy đua nhiều cấu hình solver trong các tiến trình riêng (portfolio.py),
+        lấy lời giải về trước và dừng các tiến trình còn lại
+        Kết quả (cấu hình thắng, nhãn tối ưu) giữ ở self.race_result
+        Ngân sách: chỉ giới hạn thời gian và cờ hủy được áp dụng (các tiến trình con
+        không chia sẻ bộ đếm nút / bộ nhớ với tiến trình này)
+        """
+        level = self.get_level(goal)
+        self.exceeded = None
+        cancel = None
+        if self.budget is not None:
+            cancel = self.budget.cancel
+            if self.budget.time_limit is not None:
+                timeout = min(timeout or self.budget.time_limit, self.budget.time_limit)
+        result = portfolio.race(level.base_map, goal, start_state.player, start_state.boxes,
+                                timeout=timeout, cancel=cancel)
+        self.race_result = result
+        self.stats = SearchStats()
+        if result is None:
+            # race chỉ trả None khi bị hủy hoặc hết giờ; không có giới hạn nào thì là không có lời giải
+            if cancel is not None and cancel.cancelled:
+                self.exceeded = "cancelled"
+            elif timeout is not None:
+                self.exceeded = f"time limit ({timeout}s)"
+            self.stats.exceeded = self.exceeded
+            return self.finish(None)
+        self.stats.expanded = result.expanded
+        return self.finish(result.moves)
+
+    def solve_cached(self, method, start_state, goal, solve):
+        """
+        Tra bộ nhớ đệm lời giải (self.cache) trước khi gọi solve()
+        method: tên phương pháp, là một phần của khóa cache
+        solve: hàm không tham số gọi một phương thức giải của Solver, trả về chuỗi di chuyển
+        Khóa lấy theo hướng chuẩn của level (symmetry.py): các level là ảnh quay / lật
+        của nhau dùng chung một mục, lời giải được đổi về hướng của level hiện tại
+        """
+        self.cache_hit = False
+        self.exceeded = None
+        if self.cache is None:
+            return solve()
+        level = self.get_level(goal)
+        transform, canonical = symmetry.canonicalize(level.base_map, goal, start_state.player, start_state.boxes)
+        key = solution_cache.make_key(*canonical, method)
+        entry = self.cache.get(key)
+        if entry is not None:
+            moves, stats = entry
+            self.cache_hit = True
+            self.stats = SearchStats()
+            self.stats.expanded = stats["expanded"]
+            return self.finish(symmetry.moves_from_canonical(moves, transform))
+        moves = solve()
+        if self.exceeded is not None:
+            return moves  # Dừng vì ngân sách không phải là kết luận "không có lời giải", không lưu
+        self.cache.put(key, symmetry.moves_to_canonical(moves, transform), self.stats.as_dict())
+        return moves
+
+    def finish(self, moves):
+        """Kết thúc một lần giải: dừng đồng hồ của stats, giữ chuỗi di chuyển ở self.moves"""
+        if self.stats is not None:
+            self.stats.stop()
+        self.moves = moves
+        return moves
+
+    def moves_to_path(self, start_state, moves):
+        """
+        Dựng danh sách GameState từ chuỗi di chuyển, chỉ khi cần (ví dụ để animate)
+        Trả về [] nếu moves là None
+        """
+        if moves is None:
+            return []
+        steps = solver_core.replay_moves(start_state.player, start_state.boxes, moves)
+        return [GameState(player, boxes, cost) for cost, (player, boxes) in enumerate(steps)]
 
 
 class Utils:
@@ -235,37 +303,15 @@ class Utils:
             print("".join(r))
         print()
 
-    def print_path(self, init_player_pos, path):
+    def print_path(self, moves):
         """
-        Chuyển đổi đường đi thành chuỗi hướng di chuyển
+        In đường đi dưới dạng chuỗi hướng di chuyển
         U: Up, D: Down, L: Left, R: Right
         """
-        if not path:
+        if moves is None:
             print("No solution path to print.")
             return
-
-        curr_pos = init_player_pos
-        path_str = ""
-
-        # Duyệt qua từng bước di chuyển trong path (bỏ qua trạng thái đầu)
-        for state in path[1:]:
-            next_pos = state.player
-            # Tính vector di chuyển
-            dx = next_pos[0] - curr_pos[0]
-            dy = next_pos[1] - curr_pos[1]
-
-            # Ánh xạ vector thành ký tự hướng di chuyển
-            if (dx, dy) == (1, 0):
-                path_str += "R"  # Right
-            elif (dx, dy) == (-1, 0):
-                path_str += "L"  # Left
-            elif (dx, dy) == (0, 1):
-                path_str += "D"  # Down
-            elif (dx, dy) == (0, -1):
-                path_str += "U"  # Up
-            curr_pos = next_pos
-
-        print(f"Path: {path_str}\n")
+        print(f"Path: {moves}\n")
 
     def clear_screen(self):
         """Xóa màn hình console"""
@@ -299,19 +345,18 @@ class Utils:
             time.sleep(0.2)
 
 
-def main():
+def load_level(level_file):
     """
-    Hàm chính của chương trình
-    Điều khiển luồng thực thi từ đầu đến cuối
+    Đọc và parse file bản đồ
+    Trả về (base_map, player, boxes, goals); player = None nếu file không có người chơi
+    File rỗng (không có dòng nào khác rỗng) -> ValueError
     """
-    global game_map
     # Khởi tạo các biến lưu trữ thông tin game
-    player = (0, 0)
+    player = None
     boxes = set()
     goals = set()
 
-    # Đọc và parse file bản đồ
-    with open("./testcases/level27.txt", "r") as file:
+    with open(level_file, "r") as file:
         base_map = []
         # Duyệt qua từng dòng trong file
         for row, line in enumerate(file):
@@ -345,6 +390,24 @@ def main():
                     map_row.append(char)
             base_map.append(map_row)
 
+    if not any(base_map):
+        raise ValueError(f"empty level: {level_file}")
+    return base_map, player, boxes, goals
+
+
+def main():
+    """
+    Hàm chính của chương trình
+    Điều khiển luồng thực thi từ đầu đến cuối
+    """
+    global game_map
+    # Đọc và parse file bản đồ
+    try:
+        base_map, player, boxes, goals = load_level("./testcases/level27.txt")
+    except (OSError, ValueError) as e:
+        print(f"Cannot load level: {e}")
+        return
+
     # Gán bản đồ cho biến toàn cục
     game_map = base_map
     # Tạo trạng thái bắt đầu
@@ -354,62 +417,87 @@ def main():
 
     # Khởi tạo solver và utils
     solver = Solver()
+    solver.cache = solution_cache.SolutionCache()
+    # Đo thời gian từng công đoạn của tìm kiếm (thay cho tracemalloc, vốn làm chậm cả lần giải)
+    solver.instrument(timing=True)
     utils = Utils()
+    # Phân tích tĩnh level (ô chết, bảng Zobrist...) một lần khi load
+    solver.get_level(goal)
 
     # Hiển thị trạng thái ban đầu
     print("Initial State:")
     utils.animate([start_state], goals, base_map)
 
     # Menu lựa chọn thuật toán
-    print("1. DFS\n2. BFS\n3. A*")
+    print("1. DFS (IDA*)\n2. BFS\n3. A*\n4. BFS (push)\n5. A* (push)\n6. A* (push, matching)\n7. BFS (NumPy)\n8. Bidirectional (push/pull)\n9. Race (portfolio)\n10. HDA* (parallel)\n11. BFS (push, macro moves)\n12. A* (push, matching, macro moves)\n13. Anytime A* (push)\n14. Optimal (pushes, then moves)\n15. Optimal (moves, then pushes)")
     n = input("Please choose a solving method: ")
 
-    if n == "2":
-        # Giải bằng BFS
-        print("\nSolving with BFS...")
-        tracemalloc.start()  # ✅ Bắt đầu đo bộ nhớ
-        start_time = time.time()
-        path = solver.bfs(start_state, goal)
-        end_time = time.time()
-        current, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()  # ✅ Dừng đo bộ nhớ
-
-        # Hiển thị kết quả hiệu năng
-        print(f"Solver finished in {end_time - start_time:.4f} seconds.")
-        print(f"Memory used: {current / 1024:.2f} KB; Peak: {peak / 1024:.2f} KB\n")
-
-        if path:
-            # Hiển thị kết quả thành công
-            print(f"Solution found! Moves count: {len(path) - 1}")
-            utils.print_path(player, path)
-            if input("Animate the solution? (y/n): ").lower() == "y":
-                utils.animate(path, goals, base_map)
-        else:
-            print("No solution found.")
-
-    elif n == "3":
-        # Giải bằng A* (tương tự BFS)
-        print("\nSolving with A*...")
-        tracemalloc.start()
-        start_time = time.time()
-        path = solver.a_star(start_state, goal)
-        end_time = time.time()
-        current, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
-
-        print(f"Solver finished in {end_time - start_time:.4f} seconds.")
-        print(f"Memory used: {current / 1024:.2f} KB; Peak: {peak / 1024:.2f} KB\n")
-
-        if path:
-            print(f"Solution found! Moves count: {len(path) - 1}")
-            utils.print_path(player, path)
-            if input("Animate the solution? (y/n): ").lower() == "y":
-                utils.animate(path, goals, base_map)
-        else:
-            print("No solution found.")
+    # Ánh xạ lựa chọn -> (tên thuật toán, tên trong cache, hàm giải)
+    # Chế độ push tìm theo từng lần đẩy hộp, nhanh hơn nhiều trên level lớn
+    methods = {
+        "1": ("DFS (IDA*)", "idastar", lambda: solver.dfs(start_state, goal)),
+        "2": ("BFS", "bfs", lambda: solver.bfs(start_state, goal)),
+        "3": ("A*", "astar", lambda: solver.a_star(start_state, goal)),
+        "4": ("BFS (push)", "bfs-push", lambda: solver.bfs(start_state, goal, push=True)),
+        "5": ("A* (push)", "astar-push", lambda: solver.a_star(start_state, goal, push=True)),
+        "6": ("A* (push, matching)", "astar-push-matching",
+              lambda: solver.a_star(start_state, goal, push=True, heuristic="matching")),
+        "7": ("BFS (NumPy)", "bfs-numpy", lambda: solver.bfs_vectorized(start_state, goal)),
+        "8": ("Bidirectional", "bidirectional", lambda: solver.bidirectional(start_state, goal)),
+        "9": ("Race (portfolio)", "race", lambda: solver.race(start_state, goal)),
+        "10": ("HDA* (parallel)", "hda-star", lambda: solver.hda_star(start_state, goal)),
+        "11": ("BFS (push, macro moves)", "bfs-push-macro", lambda: solver.bfs(start_state, goal, push=True, macros=True)),
+        "12": ("A* (push, matching, macro moves)", "astar-push-matching-macro",
+               lambda: solver.a_star(start_state, goal, push=True, heuristic="matching", macros=True)),
+        "13": ("Anytime A* (push)", "astar-anytime", lambda: solver.anytime_a_star(
+            start_state, goal, on_solution=lambda moves, cost, weight: print(
+                f"  weight {weight}: {cost} pushes, {len(moves)} moves"))),
+        "14": ("Optimal (pushes, then moves)", "optimal-pushes-moves",
+               lambda: solver.optimal(start_state, goal, model="pushes-moves")),
+        "15": ("Optimal (moves, then pushes)", "optimal-moves-pushes",
+               lambda: solver.optimal(start_state, goal, model="moves-pushes")),
+    }
+    if n not in methods:
+        print("Invalid choice.")
+        return
+
+    name, cache_name, solve = methods[n]
+    print(f"\nSolving with {name}...")
+    start_time = time.time()
+    try:
+        moves = solver.solve_cached(cache_name, start_state, goal, solve)
+    except RuntimeError as e:
+        # Race khi mọi cấu hình đều lỗi, HDA* khi một worker chết
+        print(f"Solver failed after {time.time() - start_time:.4f} seconds: {e}")
+        return
+    end_time = time.time()
+    peak = peak_rss_kb()
+
+    # Hiển thị kết quả hiệu năng
+    print(f"Solver finished in {end_time - start_time:.4f} seconds.")
+    if solver.cache_hit:
+        print("Solution loaded from cache.")
     else:
-        print("Only BFS and A* are runnable right now.")
-
+        print(solver.stats.format_report())
+    print(f"Peak RSS: {peak if peak is not None else 'n/a'} KB\n")
+
+    if solver.exceeded is not None:
+        print(f"Search stopped: {solver.exceeded}")
+    if moves is not None:
+        # Hiển thị kết quả thành công (anytime A* bị dừng vẫn có lời giải tốt nhất đã tìm được)
+        if solver.exceeded is not None:
+            print(f"Best solution so far (not proven optimal). Moves count: {len(moves)}")
+        else:
+            print(f"Solution found! Moves count: {len(moves)}")
+        if n == "9" and not solver.cache_hit:
+            result = solver.race_result
+            print(f"Winner: {result.method} ({result.quality()})")
+        utils.print_path(moves)
+        if input("Animate the solution? (y/n): ").lower() == "y":
+            # Chỉ dựng danh sách trạng thái khi cần animate
+            utils.animate(solver.moves_to_path(start_state, moves), goals, base_map)
+    elif solver.exceeded is None:
+        print("No solution found.")
 
 if __name__ == "__main__":
     # Điểm bắt đầu của chương trình
@@ -0,0 +1,161 @@
+"""
+Giải hàng loạt level không cần tương tác (headless)
+
+Nhận một thư mục hoặc mẫu glob các file level, giải song song trong một
+process pool (mỗi level một tiến trình con) và ghi kết quả từng level
+dưới dạng JSON lines: chuỗi di chuyển, số nút đã mở rộng, thời gian, RSS đỉnh.
+Có thể đặt trần thời gian / số nút / bộ nhớ cho mỗi level (--time-limit,
+--node-limit, --memory-limit); level vượt trần được ghi "budget_exceeded" kèm
+thống kê dở dang thay vì làm cạn bộ nhớ của máy. Với astar-anytime, level vượt trần
+vẫn có lời giải tốt nhất tìm được trước khi dừng, cùng danh sách "improvements".
+
+Ví dụ:
+    python batch_solver.py testcases --method astar-push-matching --workers 4
+    python batch_solver.py "testcases/level1*.txt" --output results.jsonl
+    python batch_solver.py testcases --method bfs --time-limit 10 --memory-limit 1024
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import BFS_and_heuristic
+import cost_models
+import solver_core
+from BFS_and_heuristic import GameState, Solver, load_level
+from search_stats import Budget, peak_rss_kb
+
+# Tên phương pháp -> hàm gọi Solver
+METHODS = {
+    "idastar": lambda solver, start, goal: solver.dfs(start, goal),
+    "bfs": lambda solver, start, goal: solver.bfs(start, goal),
+    "astar": lambda solver, start, goal: solver.a_star(start, goal),
+    "bfs-push": lambda solver, start, goal: solver.bfs(start, goal, push=True),
+    "astar-push": lambda solver, start, goal: solver.a_star(start, goal, push=True),
+    "astar-push-matching": lambda solver, start, goal: solver.a_star(start, goal, push=True, heuristic="matching"),
+    "bfs-numpy": lambda solver, start, goal: solver.bfs_vectorized(start, goal),
+    "bidirectional": lambda solver, start, goal: solver.bidirectional(start, goal),
+    "hda-star": lambda solver, start, goal: solver.hda_star(start, goal),
+    "bfs-push-macro": lambda solver, start, goal: solver.bfs(start, goal, push=True, macros=True),
+    "astar-push-matching-macro": lambda solver, start, goal: solver.a_star(
+        start, goal, push=True, heuristic="matching", macros=True),
+    "astar-anytime": lambda solver, start, goal: solver.anytime_a_star(start, goal),
+}
+# Lời giải tối ưu theo từng mô hình chi phí (cost_models.py): optimal-moves, optimal-pushes-moves...
+METHODS.update({
+    f"optimal-{model}": lambda solver, start, goal, model=model: solver.optimal(start, goal, model=model)
+    for model in cost_models.COST_MODELS
+})
+
+
+def find_levels(source):
+    """
+    Danh sách file level từ một thư mục (mọi file *.txt) hoặc một mẫu glob
+    Sắp theo thứ tự tự nhiên: level2 đứng trước level10
+    """
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, "*.txt"))
+    else:
+        paths = glob.glob(source)
+    return sorted(paths, key=lambda p: [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", p)])
+
+
+def solve_level(level_file, method, limits=None):
+    """
+    Giải một level trong tiến trình con
+    limits: tham số của search_stats.Budget (time_limit, node_limit, memory_limit_kb) hoặc None
+    Trả về dict kết quả để ghi thành một dòng JSON
+    """
+    result = {"level": level_file, "method": method}
+    try:
+        base_map, player, boxes, goals = load_level(level_file)
+        if player is None or not boxes:
+            result["error"] = "invalid level: missing player or boxes"
+            return result
+
+        BFS_and_heuristic.game_map = base_map
+        solver = Solver()
+        if limits:
+            solver.budget = Budget(**limits)
+        start_state = GameState(player, boxes)
+        start_time = time.perf_counter()
+        moves = METHODS[method](solver, start_state, frozenset(goals))
+        elapsed = time.perf_counter() - start_time
+    except Exception as exc:  # Ghi lỗi của level này, không làm hỏng cả lô
+        result["error"] = f"{type(exc).__name__}: {exc}"
+        return result
+
+    result.update({
+        "solved": moves is not None,
+        "moves": moves,
+        "move_count": len(moves) if moves is not None else None,
+        "push_count": solver_core.count_pushes(player, boxes, moves) if moves is not None else None,
+        "nodes_expanded": solver.stats.expanded,
+        "stats": solver.stats.as_dict(),
+        "time": round(elapsed, 4),
+        "peak_rss_kb": peak_rss_kb(),
+    })
+    if solver.exceeded is not None:
+        result["budget_exceeded"] = solver.exceeded
+    if method == "astar-anytime":
+        # Các lời giải tốt dần; lời giải cuối đã chứng minh tối ưu nếu không vượt ngân sách
+        result["improvements"] = [
+            {"pushes": cost, "weight": weight, "nodes_expanded": expanded, "time": round(seconds, 4)}
+            for cost, weight, expanded, seconds in solver.anytime_solutions
+        ]
+    return result
+
+
+def run_batch(paths, method, workers=None, out=sys.stdout, limits=None):
+    """
+    Giải song song các level, ghi mỗi kết quả ngay khi xong
+    limits: ngân sách cho mỗi level, xem solve_level()
+    Mỗi tiến trình con chỉ giải một level (max_tasks_per_child=1) nên RSS đỉnh là của riêng level đó
+    """
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as pool:
+        futures = [pool.submit(solve_level, path, method, limits) for path in paths]
+        for future in as_completed(futures):
+            result = future.result()
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve Sokoban levels in parallel and write JSON lines.")
+    parser.add_argument("source", help="directory of level files or a glob pattern")
+    parser.add_argument("--method", choices=sorted(METHODS), default="idastar", help="solver to use (default: idastar)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--output", help="write JSON lines to this file instead of stdout")
+    parser.add_argument("--time-limit", type=float, help="seconds allowed per level")
+    parser.add_argument("--node-limit", type=int, help="expanded nodes allowed per level")
+    parser.add_argument("--memory-limit", type=float, help="resident memory allowed per level, in MB")
+    args = parser.parse_args()
+    limits = {
+        "time_limit": args.time_limit,
+        "node_limit": args.node_limit,
+        "memory_limit_kb": int(args.memory_limit * 1024) if args.memory_limit is not None else None,
+    }
+
+    paths = find_levels(args.source)
+    if not paths:
+        parser.error(f"no level files match {args.source!r}")
+
+    if args.output:
+        with open(args.output, "w") as out:
+            results = run_batch(paths, args.method, args.workers, out, limits)
+    else:
+        results = run_batch(paths, args.method, args.workers, limits=limits)
+    solved = sum(1 for r in results if r.get("solved"))
+    exceeded = sum(1 for r in results if "budget_exceeded" in r)
+    print(f"Solved {solved}/{len(results)} levels ({exceeded} stopped by a limit).", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Bộ benchmark cho các solver trên testcases/level*.txt
+
+Mỗi cặp (level, phương pháp) được chạy nhiều lần, mỗi lần trong một tiến trình
+mới (RSS đỉnh đo được là của riêng lần chạy đó, không bị tracemalloc làm chậm).
+Ghi lại: số nút đã mở rộng, số nút / giây, thời gian (trung vị), RSS đỉnh, độ dài lời giải.
+Lần chạy vượt --timeout bị dừng và ghi trạng thái "timeout" (không lặp lại).
+
+Kết quả có thể lưu làm baseline (--save-baseline); các lần sau so với baseline và
+báo hồi quy khi thời gian / số nút / bộ nhớ tăng quá ngưỡng, lời giải dài hơn
+hoặc level từng giải được nay không giải được. Có hồi quy thì thoát với mã 1.
+
+Ví dụ:
+    python benchmark.py --methods idastar astar-push-matching --save-baseline
+    python benchmark.py --methods idastar astar-push-matching --threshold 0.2
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+
+from batch_solver import METHODS, find_levels, solve_level
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+# Chênh lệch thời gian nhỏ hơn mức này (giây) coi là nhiễu đo, không phải hồi quy
+MIN_TIME_DELTA = 0.05
+# Tương tự cho RSS đỉnh (KB): chênh vài trăm KB giữa các lần chạy là bình thường
+MIN_RSS_DELTA_KB = 1024
+
+
+def _child(level_file, method, conn):
+    """Tiến trình con: giải một lần rồi gửi kết quả qua pipe"""
+    conn.send(solve_level(level_file, method))
+    conn.close()
+
+
+def run_once(level_file, method, timeout):
+    """Một lần chạy trong tiến trình riêng; dừng tiến trình nếu quá timeout (giây)"""
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_child, args=(level_file, method, sender))
+    process.start()
+    sender.close()
+    result = None
+    if receiver.poll(timeout):
+        try:
+            result = receiver.recv()
+        except EOFError:  # Tiến trình con chết trước khi gửi (ví dụ hết bộ nhớ)
+            result = {"level": level_file, "method": method, "error": "worker died"}
+    if process.is_alive():
+        process.kill()
+    process.join()
+    receiver.close()
+    if result is None:
+        return {"level": level_file, "method": method, "status": "timeout"}
+    return result
+
+
+def summarize(runs):
+    """Gộp các lần chạy của một cặp (level, phương pháp) thành một bản ghi"""
+    first = runs[0]
+    if first.get("status") == "timeout":
+        return {"status": "timeout"}
+    if "error" in first:
+        return {"status": "error", "error": first["error"]}
+    times = [run["time"] for run in runs]
+    median = statistics.median(times)
+    nodes = first["nodes_expanded"]
+    peaks = [run["peak_rss_kb"] for run in runs if run["peak_rss_kb"] is not None]
+    return {
+        "status": "solved" if first["solved"] else "no solution",
+        "nodes_expanded": nodes,
+        "nodes_per_sec": round(nodes / median) if median > 0 else None,
+        "time_median": round(median, 4),
+        "time_min": round(min(times), 4),
+        "peak_rss_kb": max(peaks) if peaks else None,
+        "solution_length": first["move_count"],
+        "pushes": first["push_count"],
+        "repetitions": len(runs),
+    }
+
+
+def run_suite(paths, methods, repetitions, timeout, log=sys.stderr):
+    """Chạy toàn bộ bộ benchmark, trả về dict khóa "level:phương pháp" -> bản ghi"""
+    results = {}
+    for path in paths:
+        for method in methods:
+            runs = []
+            for _ in range(repetitions):
+                run = run_once(path, method, timeout)
+                runs.append(run)
+                if run.get("status") == "timeout" or "error" in run:
+                    break  # Lặp lại cũng cho kết quả tương tự, bỏ qua cho nhanh
+            key = f"{os.path.basename(path)}:{method}"
+            results[key] = summarize(runs)
+            print(f"{key:40} {_describe(results[key])}", file=log)
+    return results
+
+
+def _describe(record):
+    """Một dòng tóm tắt để in trong khi chạy"""
+    if record["status"] not in ("solved", "no solution"):
+        return record["status"]
+    return (f"{record['status']:12} {record['time_median']:>9.4f}s {record['nodes_expanded']:>10} nodes"
+            f" {record['nodes_per_sec'] or 0:>9}/s {record['peak_rss_kb'] or 0:>9} KB"
+            f" len={record['solution_length']}")
+
+
+def compare(results, baseline, threshold):
+    """Danh sách mô tả các hồi quy so với baseline"""
+    regressions = []
+    for key, record in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        if old["status"] == "solved" and record["status"] != "solved":
+            regressions.append(f"{key}: {old['status']} -> {record['status']}")
+            continue
+        if record["status"] != "solved" or old["status"] != "solved":
+            continue
+        if (record["time_median"] > old["time_median"] * (1 + threshold)
+                and record["time_median"] - old["time_median"] > MIN_TIME_DELTA):
+            regressions.append(f"{key}: time {old['time_median']}s -> {record['time_median']}s")
+        if record["nodes_expanded"] > old["nodes_expanded"] * (1 + threshold):
+            regressions.append(f"{key}: nodes_expanded {old['nodes_expanded']} -> {record['nodes_expanded']}")
+        if (old["peak_rss_kb"] and record["peak_rss_kb"]
+                and record["peak_rss_kb"] > old["peak_rss_kb"] * (1 + threshold)
+                and record["peak_rss_kb"] - old["peak_rss_kb"] > MIN_RSS_DELTA_KB):
+            regressions.append(f"{key}: peak_rss_kb {old['peak_rss_kb']} -> {record['peak_rss_kb']}")
+        if record["solution_length"] > old["solution_length"]:
+            regressions.append(f"{key}: solution length {old['solution_length']} -> {record['solution_length']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Sokoban solvers and detect regressions.")
+    parser.add_argument("--levels", default="testcases/level*.txt", help="directory or glob of level files")
+    parser.add_argument("--methods", nargs="+", choices=sorted(METHODS), default=sorted(METHODS),
+                        help="solvers to benchmark (default: all)")
+    parser.add_argument("--repetitions", type=int, default=3, help="runs per level and solver (default: 3)")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds before a run is stopped (default: 30)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help=f"baseline file (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="relative increase reported as a regression (default: 0.25)")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    paths = find_levels(args.levels)
+    if not paths:
+        parser.error(f"no level files match {args.levels!r}")
+    results = run_suite(paths, args.methods, args.repetitions, args.timeout)
+
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(results, out, indent=2, sort_keys=True)
+    if args.save_baseline:
+        # Giữ các mục cũ không được chạy lại lần này
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+        baseline.update(results)
+        with open(args.baseline, "w") as out:
+            json.dump(baseline, out, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}.", file=sys.stderr)
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against (run with --save-baseline first).", file=sys.stderr)
+        return
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) against {args.baseline}:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        sys.exit(1)
+    print(f"No regressions against {args.baseline}.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Tìm kiếm hai chiều trên không gian đẩy hộp
+
+- Chiều xuôi: BFS đẩy hộp từ trạng thái đầu (solver_core.push_successors)
+- Chiều ngược: BFS "kéo" hộp từ trạng thái đã giải (mọi hộp trên goal,
+  người chơi ở bất kỳ vùng nào kề một hộp)
+Hai chiều dùng chung cách chuẩn hóa (tập hộp, ô nhỏ nhất của vùng người chơi)
+và chung khóa Zobrist, nên gặp nhau khi một trạng thái có mặt trong cả hai bảng.
+Mỗi vòng mở rộng trọn một lớp của phía có frontier nhỏ hơn; khi gặp nhau thì
+lấy điểm gặp có tổng độ sâu nhỏ nhất trong lớp đó -> ít lần đẩy nhất.
+"""
+from level_analysis import iter_bits
+from search_stats import SearchStats
+from solver_core import CompactState, pushes_to_moves, push_successors, reachable
+
+
+def pull_successors(level, state):
+    """
+    Sinh trạng thái trước đó bằng cách kéo hộp (ngược với một lần đẩy)
+    Hộp ở ô c được kéo về c - off khi người chơi đứng ở c - off và ô c - 2*off trống
+    Trả về danh sách (lần đẩy xuôi tương ứng, trạng thái), lần đẩy = (ô hộp, hướng)
+    """
+    walls = level.walls
+    box_keys = level.box_keys
+    player_keys = level.player_keys
+    boxes = state.boxes
+    seen, _ = reachable(level, boxes, state.player)
+    children = []
+    for box in iter_bits(boxes):
+        for d, off in enumerate(level.offsets):
+            stand = box - off
+            behind = stand - off
+            if not seen[stand] or walls[behind] or boxes >> behind & 1:
+                continue
+            new_boxes = boxes ^ (1 << box) ^ (1 << stand)
+            _, player = reachable(level, new_boxes, behind)
+            zhash = (state.zhash ^ box_keys[box] ^ box_keys[stand]
+                     ^ player_keys[state.player] ^ player_keys[player])
+            children.append(((stand, d), CompactState(player, new_boxes, zhash, state.cost + 1)))
+    return children
+
+
+def solved_states(level):
+    """
+    Các trạng thái đích cho chiều ngược: mọi hộp trên goal,
+    mỗi vùng ô trống kề ít nhất một hộp cho một trạng thái
+    """
+    boxes = level.goal_mask
+    walls = level.walls
+    covered = bytearray(level.size)
+    states = []
+    for cell in range(level.size):
+        if walls[cell] or covered[cell] or boxes >> cell & 1:
+            continue
+        seen, lowest = reachable(level, boxes, cell)
+        region = [i for i in range(level.size) if seen[i]]
+        for i in region:
+            covered[i] = 1
+        touches_box = any(boxes >> (i + off) & 1 for i in region for off in level.offsets)
+        if touches_box:
+            states.append(CompactState(lowest, boxes, level.zobrist(lowest, boxes)))
+    return states
+
+
+def bidirectional(level, player, boxes, stats=None):
+    """
+    Tìm kiếm hai chiều: đẩy xuôi từ trạng thái đầu, kéo ngược từ trạng thái đã giải
+    player, boxes: vị trí (x, y) ban đầu; trả về chuỗi di chuyển hoặc None
+    stats: SearchStats (search_stats.py), bộ đếm của cả hai chiều; báo cáo tiến độ /
+    kiểm tra ngân sách ngay trong lớp (ngưỡng report_at như a_star) với frontier là số
+    trạng thái đang chờ mở rộng của cả hai chiều
+    """
+    stats = stats or SearchStats()
+    start_player = level.index(player)
+    start_boxes = level.box_mask(boxes)
+    _, lowest = reachable(level, start_boxes, start_player)
+    start = CompactState(lowest, start_boxes, level.zobrist(lowest, start_boxes))
+    if start_boxes == level.goal_mask:
+        return ""
+
+    forward_successors = stats.timed("push", push_successors)
+    backward_successors = stats.timed("pull", pull_successors)
+    # parents: trạng thái -> (trạng thái kề về phía gốc của chiều đó, lần đẩy xuôi)
+    forward = {start: None}
+    backward = {state: None for state in solved_states(level)}
+    forward_frontier = [start]
+    backward_frontier = list(backward)
+
+    while forward_frontier and backward_frontier:
+        # Mở rộng phía có frontier nhỏ hơn
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meet = _expand_layer(level, forward_frontier, forward, backward, forward_successors,
+                                                   stats, len(backward_frontier))
+        else:
+            backward_frontier, meet = _expand_layer(level, backward_frontier, backward, forward, backward_successors,
+                                                    stats, len(forward_frontier))
+        if meet is not None:
+            pushes = _forward_pushes(forward, meet) + _backward_pushes(backward, meet)
+            return pushes_to_moves(level, start_player, start_boxes, pushes)
+
+    return None
+
+
+def _expand_layer(level, frontier, own, other, successors, stats, waiting):
+    """
+    Mở rộng trọn một lớp của một chiều
+    waiting: kích thước frontier của chiều kia, chỉ để báo cáo tiến độ
+    Trả về (frontier mới, điểm gặp có tổng độ sâu nhỏ nhất hoặc None)
+    """
+    next_frontier = []
+    meet = None
+    best = None
+    for i, state in enumerate(frontier):
+        stats.expanded += 1
+        if stats.expanded >= stats.report_at:
+            # Lớp có thể rất lớn: kiểm tra ngân sách / hủy giữa lớp chứ không chờ hết lớp
+            stats.report(len(frontier) - i + len(next_frontier) + waiting)
+        children = successors(level, state)
+        stats.generated += len(children)
+        for action, child in children:
+            if child in own:
+                stats.duplicates += 1
+                continue
+            own[child] = (state, action)
+            next_frontier.append(child)
+            if child in other:
+                # Độ sâu phía bên kia lấy từ bản lưu trong bảng của phía đó
+                total = child.cost + _depth(other, child)
+                if best is None or total < best:
+                    best, meet = total, child
+    return next_frontier, meet
+
+
+def _depth(parents, state):
+    """Độ sâu của state trong cây tìm kiếm của một chiều"""
+    depth = 0
+    while parents[state] is not None:
+        state = parents[state][0]
+        depth += 1
+    return depth
+
+
+def _forward_pushes(forward, state):
+    """Các lần đẩy từ trạng thái đầu tới state"""
+    pushes = []
+    while forward[state] is not None:
+        state, push = forward[state]
+        pushes.append(push)
+    pushes.reverse()
+    return pushes
+
+
+def _backward_pushes(backward, state):
+    """Các lần đẩy từ state tới trạng thái đã giải (theo thứ tự thực hiện)"""
+    pushes = []
+    while backward[state] is not None:
+        state, push = backward[state]
+        pushes.append(push)
+    return pushes
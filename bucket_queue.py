@@ -0,0 +1,58 @@
+"""
+Open list dạng bucket queue cho A* (solver_core.a_star)
+
+f là số nguyên nhỏ (số bước / số lần đẩy cộng heuristic đã nhân hệ số SCALE),
+nên thay heap bằng mảng bucket theo f:
+- buckets[f] là danh sách các ngăn theo g; trong cùng f ưu tiên g lớn (tương đương
+  h nhỏ - trạng thái gần đích hơn), cùng (f, g) thì vào sau ra trước
+- push: O(1) - thêm vào cuối ngăn
+- pop: O(1) trừ bước dò tới bucket khác rỗng kế tiếp; con trỏ min_f chỉ lùi lại khi
+  heuristic không nhất quán đưa vào f nhỏ hơn
+Không bao giờ so sánh hai trạng thái với nhau. Bản cũ của trạng thái đã được cải thiện
+vẫn nằm trong ngăn; A* tự bỏ qua khi lấy ra (so g lưu kèm với g tốt nhất, phép so số nguyên).
+"""
+
+
+class BucketQueue:
+    """Hàng đợi ưu tiên theo (f nhỏ, g lớn) với f, g là số nguyên không âm"""
+
+    def __init__(self):
+        # buckets[f]: None hoặc danh sách ngăn theo g, ngăn cuối luôn khác rỗng
+        self.buckets = []
+        self.min_f = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, f, g, item):
+        """Thêm item với khóa (f, g)"""
+        buckets = self.buckets
+        if f >= len(buckets):
+            buckets.extend([None] * (f + 1 - len(buckets)))
+        bucket = buckets[f]
+        if bucket is None:
+            bucket = buckets[f] = []
+        if g >= len(bucket):
+            bucket.extend([] for _ in range(g + 1 - len(bucket)))
+        bucket[g].append(item)
+        if f < self.min_f:
+            self.min_f = f
+        self.size += 1
+
+    def pop(self):
+        """Lấy item có f nhỏ nhất, cùng f thì g lớn nhất; trả về (f, item)"""
+        if not self.size:
+            raise IndexError("pop from an empty bucket queue")
+        buckets = self.buckets
+        f = self.min_f
+        while not buckets[f]:
+            f += 1
+        self.min_f = f
+        bucket = buckets[f]
+        item = bucket[-1].pop()
+        # Giữ bất biến: ngăn cuối khác rỗng (bỏ các ngăn rỗng ở cuối)
+        while bucket and not bucket[-1]:
+            bucket.pop()
+        self.size -= 1
+        return f, item
@@ -0,0 +1,94 @@
+"""
+Cắt tỉa PI-corral cho tìm kiếm theo lần đẩy (solver_core.push_successors)
+
+Corral là một vùng ô trống người chơi không đi tới được, bị rào bởi tường và hộp.
+Hộp rào (barrier) là các hộp kề vùng đó. Corral là PI-corral khi:
+- I: mọi lần đẩy hộp rào mà người chơi có thể làm đều đẩy hộp VÀO corral; các lần đẩy
+  khác bị chặn vĩnh viễn cho tới khi có một hộp rào đi vào corral (bị tường / ô chết
+  chặn, hoặc chỗ đứng / ô đích là một hộp rào khác hay nằm trong corral)
+- P: người chơi đang đứng được ở mọi chỗ cần để đẩy hộp rào vào corral
+- Corral còn việc phải làm: có hộp rào ngoài goal hoặc goal trống bên trong
+Khi đó lời giải nào cũng phải đẩy một hộp rào vào corral trước khi đụng tới vùng này,
+và các lần đẩy đó đều làm được ngay, nên chỉ cần sinh các lần đẩy hộp rào của một
+PI-corral (chọn corral có ít lần đẩy nhất). Corral không có lần đẩy hợp lệ nào nghĩa là
+trạng thái đã deadlock.
+
+Corral được tìm bằng flood fill từ các ô trống kề hộp mà người chơi không tới được,
+nên vùng đệm ngoài bản đồ không bao giờ bị duyệt.
+"""
+from level_analysis import iter_bits
+
+
+def pi_corral(level, boxes, seen):
+    """
+    Tìm PI-corral của trạng thái
+    boxes: bitboard hộp, seen: mảng các ô người chơi đi tới được (solver_core.reachable)
+    Trả về bitboard các hộp rào của PI-corral có ít lần đẩy nhất, 0 nếu không có
+    """
+    walls = level.walls
+    offsets = level.offsets
+    marked = bytearray(level.size)
+    best, best_count = 0, None
+    for box in iter_bits(boxes):
+        for off in offsets:
+            start = box + off
+            if seen[start] or walls[start] or marked[start] or boxes >> start & 1:
+                continue
+            area, barrier = _flood_corral(level, boxes, start, marked)
+            count = _corral_pushes(level, seen, area, barrier)
+            if count is not None and (best_count is None or count < best_count):
+                best, best_count = barrier, count
+                if not count:
+                    # Corral không vào được: trạng thái deadlock, không cần xét thêm
+                    return best
+    return best
+
+
+def _flood_corral(level, boxes, start, marked):
+    """Vùng ô trống liên thông chứa start (bitmask) và bitboard các hộp kề vùng đó"""
+    walls = level.walls
+    offsets = level.offsets
+    marked[start] = 1
+    area = 1 << start
+    barrier = 0
+    stack = [start]
+    while stack:
+        cell = stack.pop()
+        for off in offsets:
+            nxt = cell + off
+            if walls[nxt] or marked[nxt]:
+                continue
+            if boxes >> nxt & 1:
+                barrier |= 1 << nxt
+                continue
+            marked[nxt] = 1
+            area |= 1 << nxt
+            stack.append(nxt)
+    return area, barrier
+
+
+def _corral_pushes(level, seen, area, barrier):
+    """
+    Số lần đẩy hộp rào vào corral nếu corral là PI-corral còn việc phải làm, ngược lại None
+    area: bitmask các ô của corral, barrier: bitboard hộp rào
+    """
+    goal_mask = level.goal_mask
+    if not (barrier & ~goal_mask or area & goal_mask):
+        return None
+    walls = level.walls
+    dead = level.dead
+    count = 0
+    for box in iter_bits(barrier):
+        for off in level.offsets:
+            behind, target = box - off, box + off
+            if walls[behind] or area >> behind & 1 or barrier >> behind & 1:
+                # Chưa đẩy được từ phía này trước khi có hộp rào vào corral
+                continue
+            if area >> target & 1:
+                if not seen[behind]:
+                    return None  # P: chỗ đứng để đẩy vào corral chưa tới được
+                if not dead[target]:
+                    count += 1
+            elif not (walls[target] or dead[target] or barrier >> target & 1):
+                return None  # I: hộp rào có thể bị đẩy ra ngoài corral
+    return count
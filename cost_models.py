@@ -0,0 +1,181 @@
+"""
+Các mô hình chi phí cho lời giải tối ưu (Solver.optimal)
+
+- "moves": ít bước nhất
+- "pushes": ít lần đẩy nhất
+- "pushes-moves": ít lần đẩy nhất, cùng số lần đẩy thì ít bước nhất
+- "moves-pushes": ít bước nhất, cùng số bước thì ít lần đẩy nhất
+
+"pushes" dùng A* theo lần đẩy sẵn có (solver_core.a_star, người chơi chuẩn hóa về ô nhỏ
+nhất trong vùng đi tới được). Các mô hình có tính số bước dùng A* trên đồ thị đẩy hộp với
+vị trí người chơi chính xác: mỗi cạnh là "đi bộ ngắn nhất tới sau một hộp rồi đẩy".
+Lời giải nào cũng là các đoạn đi bộ xen giữa các lần đẩy và đi bộ theo đường ngắn nhất
+không bao giờ tệ hơn, nên đồ thị này chứa lời giải tối ưu của cả ba mô hình, với số trạng
+thái nhỏ hơn nhiều so với tìm theo từng bước.
+
+Chi phí thứ tự từ điển (a, b) được gộp thành một số nguyên a * LEX_BASE + b (LEX_BASE lớn
+hơn mọi số bước / số lần đẩy có thể có), so sánh số nguyên chính là so sánh từ điển.
+Heuristic: ghép cặp tối thiểu m (heuristics.MatchingHeuristic) là cận dưới của số lần đẩy
+và cũng của số bước (mỗi lần đẩy là một bước), nên h = m * (chi phí một lần đẩy + chi phí
+một bước) admissible và nhất quán cho mọi mô hình.
+Không dùng cắt tỉa PI-corral (corral.py): ép đẩy vào corral trước có thể làm dài đường đi bộ.
+
+Đồ thị có vị trí người chơi chính xác lớn hơn đồ thị chuẩn hóa của "pushes" và cận dưới của
+số bước yếu hơn, nên trên level rộng các mô hình có tính số bước chậm hơn "pushes" nhiều;
+nên đặt ngân sách (Solver.budget) khi dùng chúng cho level lớn.
+"""
+from array import array
+from collections import deque
+from heapq import heappop, heappush
+
+import solver_core
+from deadlock import is_freeze_deadlock
+from heuristics import MatchingHeuristic
+from level_analysis import iter_bits
+from search_record import SearchRecord
+from search_stats import SearchStats
+from solver_core import CompactState
+
+# Cơ số gộp chi phí thứ tự từ điển, lớn hơn mọi số bước của một lời giải
+LEX_BASE = 1 << 32
+
+# Tên mô hình -> (chi phí một lần đẩy, chi phí một bước); None = A* theo lần đẩy
+COST_MODELS = {
+    "moves": (0, 1),
+    "pushes": None,
+    "pushes-moves": (LEX_BASE, 1),
+    "moves-pushes": (1, LEX_BASE),
+}
+
+
+def optimal_search(level, player, boxes, model="pushes-moves", heuristic=None, stats=None):
+    """
+    A* tối ưu theo mô hình chi phí model (tên trong COST_MODELS)
+    player, boxes: vị trí (x, y) ban đầu; trả về chuỗi di chuyển hoặc None
+    stats: SearchStats (search_stats.py); khi báo cáo tiến độ, best_f là cận dưới của
+    tiêu chí chính (số lần đẩy hoặc số bước)
+    """
+    stats = stats or SearchStats()
+    heuristic = heuristic or MatchingHeuristic()
+    if COST_MODELS[model] is None:
+        return solver_core.a_star(level, player, boxes, True, heuristic, stats)
+    push_cost, move_cost = COST_MODELS[model]
+    # Mỗi lần đẩy còn lại tốn ít nhất một lần đẩy và một bước
+    h_cost = push_cost + move_cost
+    # Đơn vị của tiêu chí chính, để báo cáo f theo số lần đẩy / số bước
+    unit = max(push_cost, move_cost)
+    successors = stats.timed("successors", walk_push_successors)
+    evaluate = stats.timed("heuristic", heuristic.evaluate)
+    update = stats.timed("heuristic", heuristic.update)
+    rebuild = stats.timed("rebuild", solver_core.rebuild_moves)
+
+    start_player = level.index(player)
+    start_boxes = level.box_mask(boxes)
+    start = CompactState(start_player, start_boxes, level.zobrist(start_player, start_boxes))
+    start.heuristic = evaluate(level, start)
+    if start.heuristic == float("inf"):
+        return None
+    record = SearchRecord(level, push=True)
+    ids, parents, actions, shift, encode = record.ids, record.parents, record.actions, record.shift, record.encode
+    # Chi phí gộp có thể vượt 32 bit
+    g_score = array("Q", [0])
+    # Phần tử open list: (f, h, id, trạng thái) - cùng f thì h nhỏ trước, id không trùng
+    # nên không bao giờ phải so sánh hai trạng thái
+    h = start.heuristic * h_cost
+    open_set = [(h, h, record.add_root(start), start)]
+    pushes, duplicates = 1, 0
+
+    try:
+        while open_set:
+            f, _, sid, current = heappop(open_set)
+            stats.pops += 1
+            # Bỏ qua bản cũ của trạng thái đã tìm được đường tốt hơn
+            if current.cost > g_score[sid]:
+                continue
+            if current.boxes == level.goal_mask:
+                return rebuild(level, record, sid, start_player, start_boxes)
+            stats.expanded += 1
+            if stats.expanded >= stats.report_at:
+                stats.report(len(open_set), f // unit)
+
+            children = successors(level, current, push_cost, move_cost)
+            stats.generated += len(children)
+            for action, child in children:
+                g = child.cost
+                key = child.boxes << shift | child.player
+                child_id = ids.get(key)
+                if child_id is None or g < g_score[child_id]:
+                    child.heuristic = update(level, current, child)
+                    if child.heuristic == float("inf"):
+                        continue
+                    code = encode(action)
+                    if child_id is None:
+                        child_id = ids[key] = len(parents)
+                        parents.append(sid)
+                        actions.append(code)
+                        g_score.append(g)
+                    else:
+                        parents[child_id] = sid
+                        actions[child_id] = code
+                        g_score[child_id] = g
+                    h = child.heuristic * h_cost
+                    heappush(open_set, (g + h, h, child_id, child))
+                    pushes += 1
+                else:
+                    duplicates += 1
+            current.hdata = None
+    finally:
+        stats.pushes += pushes
+        stats.duplicates += duplicates
+
+    return None
+
+
+def walk_push_successors(level, state, push_cost, move_cost):
+    """
+    Sinh trạng thái con trên đồ thị đẩy hộp với vị trí người chơi chính xác
+    Mỗi con: đi bộ ngắn nhất tới sau một hộp rồi đẩy, người chơi đứng ở ô cũ của hộp;
+    child.cost = state.cost + push_cost + (quãng đi bộ + 1) * move_cost
+    Trả về danh sách (lần đẩy, trạng thái con) với lần đẩy = (ô hộp, hướng)
+    """
+    walls = level.walls
+    dead = level.dead
+    box_keys = level.box_keys
+    player_keys = level.player_keys
+    boxes = state.boxes
+    dist = walk_distances(level, boxes, state.player)
+    children = []
+    for box in iter_bits(boxes):
+        for d, off in enumerate(level.offsets):
+            walk = dist.get(box - off)
+            if walk is None:
+                continue
+            target = box + off
+            if walls[target] or dead[target] or boxes >> target & 1:
+                continue
+            new_boxes = boxes ^ (1 << box) ^ (1 << target)
+            if is_freeze_deadlock(level, new_boxes, target):
+                continue
+            zhash = (state.zhash ^ box_keys[box] ^ box_keys[target]
+                     ^ player_keys[state.player] ^ player_keys[box])
+            cost = state.cost + push_cost + (walk + 1) * move_cost
+            children.append(((box, d), CompactState(box, new_boxes, zhash, cost)))
+    return children
+
+
+def walk_distances(level, boxes, start):
+    """Số bước đi bộ ngắn nhất (không đẩy hộp) từ start tới mọi ô đi tới được: dict ô -> số bước"""
+    walls = level.walls
+    offsets = level.offsets
+    dist = {start: 0}
+    q = deque([start])
+    while q:
+        cell = q.popleft()
+        step = dist[cell] + 1
+        for off in offsets:
+            nxt = cell + off
+            if nxt in dist or walls[nxt] or boxes >> nxt & 1:
+                continue
+            dist[nxt] = step
+            q.append(nxt)
+    return dist
@@ -0,0 +1,56 @@
+"""
+Phát hiện deadlock động (freeze deadlock) sau mỗi lần đẩy hộp
+
+Một hộp bị "đóng băng" khi nó không thể di chuyển theo cả trục dọc lẫn trục ngang.
+Trên một trục, hộp bị chặn nếu:
+1. Một trong hai ô hai bên là tường
+2. Cả hai ô hai bên đều là ô chết tĩnh (Level.dead)
+3. Một trong hai ô hai bên là hộp cũng đang bị đóng băng (xét đệ quy)
+Khi đang xét một hộp, hộp đó được coi như tường để tránh đệ quy vô hạn.
+Nếu hộp vừa đẩy bị đóng băng cùng một hộp nào đó không nằm trên goal -> deadlock.
+Trường hợp khối 2x2 hay hàng hộp kẹt sát tường đều rơi vào quy tắc trên.
+
+Chỉ xét vùng lân cận của hộp vừa di chuyển nên chi phí mỗi lần đẩy gần như không đổi.
+"""
+
+
+def is_freeze_deadlock(level, boxes, box):
+    """
+    Kiểm tra hộp vừa được đẩy tới ô box có gây freeze deadlock không
+    boxes: bitboard hộp sau khi đẩy
+    """
+    frozen = []
+    if not _is_frozen(level, boxes, box, set(), frozen):
+        return False
+    goal_mask = level.goal_mask
+    return any(not goal_mask >> cell & 1 for cell in frozen)
+
+
+def _is_frozen(level, boxes, cell, checking, frozen):
+    """Hộp ở ô cell có bị chặn trên cả hai trục không; ghi các hộp đóng băng vào frozen"""
+    checking.add(cell)
+    mark = len(frozen)
+    up, down, left, right = level.offsets
+    result = (_is_blocked(level, boxes, cell, down, checking, frozen)
+              and _is_blocked(level, boxes, cell, right, checking, frozen))
+    checking.discard(cell)
+    if result:
+        frozen.append(cell)
+    else:
+        # Các hộp tìm được trong nhánh này chỉ đóng băng khi cell bị coi là tường
+        del frozen[mark:]
+    return result
+
+
+def _is_blocked(level, boxes, cell, off, checking, frozen):
+    """Hộp ở ô cell có bị chặn theo trục của độ lệch off không"""
+    walls = level.walls
+    before, after = cell - off, cell + off
+    if walls[before] or walls[after]:
+        return True
+    if level.dead[before] and level.dead[after]:
+        return True
+    for nxt in (before, after):
+        if boxes >> nxt & 1 and (nxt in checking or _is_frozen(level, boxes, nxt, checking, frozen)):
+            return True
+    return False
@@ -0,0 +1,292 @@
+"""
+HDA* (Hash Distributed A*) trên không gian đẩy hộp, chạy song song nhiều tiến trình
+
+- Mỗi trạng thái thuộc về đúng một worker: worker = khóa Zobrist % số worker
+- Mỗi worker giữ open list (heapq) và bảng g của riêng mình; trạng thái con
+  thuộc worker khác được gom theo lô và gửi qua hàng đợi của worker đó
+- Heuristic ghép cặp tối thiểu (admissible) -> lời giải ít lần đẩy nhất; thành phần
+  heuristic (hdata) đi kèm trạng thái trong lô gửi đi, nên con luôn được tính tăng dần
+  từ cha (MatchingHeuristic.update) như trong solver_core.a_star, không giải Hungarian lại
+- Cùng f thì g lớn trước, cùng (f, g) thì vào sau ra trước như BucketQueue của a_star:
+  trên các "cao nguyên" f bằng nhau tìm kiếm đi sâu tới đích thay vì loang rộng
+- Khi một worker gặp trạng thái đích với g = C, nó gửi ngay cận trên C cho mọi worker
+  khác (và báo tiến trình điều phối); worker bỏ qua mọi trạng thái có f >= C
+
+Phát hiện kết thúc (four-counter của Mattern): điều phối gửi các đợt "probe",
+mỗi worker trả lời số lô đã gửi / đã nhận và có đang rảnh không. Dừng khi hai
+đợt liên tiếp đều thấy mọi worker rảnh, tổng gửi = tổng nhận và các bộ đếm không
+đổi giữa hai đợt (không còn lô nào đang trên đường đi).
+Lời giải được dựng lại bằng cách hỏi lần lượt worker sở hữu từng trạng thái cha.
+"""
+import heapq
+import multiprocessing
+import os
+import queue
+import time
+
+from heuristics import MatchingHeuristic
+from level_analysis import Level
+from search_stats import SearchStats
+from solver_core import CompactState, pushes_to_moves, push_successors, reachable
+
+# Số trạng thái mở rộng giữa hai lần đọc hàng đợi / gửi lô
+CHUNK = 64
+# Khoảng nghỉ giữa hai đợt probe của điều phối (giây)
+PROBE_INTERVAL = 0.02
+
+
+class _Worker:
+    """Một worker HDA*: sở hữu các trạng thái có khóa Zobrist % n == wid"""
+
+    def __init__(self, wid, n, level, inboxes, control):
+        self.wid = wid
+        self.n = n
+        self.level = level
+        self.heuristic = MatchingHeuristic()
+        self.inboxes = inboxes
+        self.control = control
+        # Phần tử heap: (f, -g, -thứ tự vào, người chơi, bitboard hộp, khóa Zobrist, h, hdata)
+        # thứ tự vào không trùng nên không bao giờ phải so sánh tới hdata
+        self.open_list = []
+        self.sequence = 0
+        # (người chơi, bitboard hộp) -> g tốt nhất / (khóa cha, lần đẩy)
+        self.g_score = {}
+        self.parents = {}
+        self.outgoing = [[] for _ in range(n)]
+        self.bound = float("inf")
+        self.sent = 0
+        self.received = 0
+        self.expanded = 0
+        self.generated = 0
+
+    def idle(self):
+        """Rảnh: không còn trạng thái nào có f nhỏ hơn cận trên hiện tại"""
+        return not self.open_list or self.open_list[0][0] >= self.bound
+
+    def insert(self, player, boxes, zhash, g, h, hdata, parent, push):
+        """Nhận một trạng thái thuộc worker này, chỉ giữ nếu g tốt hơn"""
+        key = (player, boxes)
+        if g + h >= self.bound or g >= self.g_score.get(key, float("inf")):
+            return
+        self.g_score[key] = g
+        self.parents[key] = (parent, push)
+        if boxes == self.level.goal_mask:
+            # Cắt tỉa ngay ở mọi worker, không chờ đợt probe kế tiếp của điều phối
+            self.bound = g
+            for wid, inbox in enumerate(self.inboxes):
+                if wid != self.wid:
+                    inbox.put(("bound", g))
+            self.control.put(("goal", self.wid, g, key))
+            return
+        self.sequence += 1
+        heapq.heappush(self.open_list, (g + h, -g, -self.sequence, player, boxes, zhash, h, hdata))
+
+    def expand(self):
+        """
+        Mở rộng tối đa CHUNK trạng thái rồi gửi các lô con cho worker sở hữu
+        Dừng sớm khi vừa gửi đi một con tốt hơn mọi trạng thái còn lại ở đây: đầu tìm kiếm
+        đã sang worker khác, mở rộng tiếp chỉ loang rộng trên cao nguyên f
+        """
+        level = self.level
+        for _ in range(CHUNK):
+            if self.idle():
+                break
+            f, neg_g, _, player, boxes, zhash, h, hdata = heapq.heappop(self.open_list)
+            g = -neg_g
+            key = (player, boxes)
+            if g > self.g_score[key]:
+                continue  # Bản cũ, đã có đường tốt hơn
+            self.expanded += 1
+            state = CompactState(player, boxes, zhash, g, h)
+            state.hdata = hdata
+            children = push_successors(level, state)
+            self.generated += len(children)
+            handoff = None
+            for push, child in children:
+                child_h = self.heuristic.update(level, state, child)
+                if child_h == float("inf"):
+                    continue
+                item = (child.player, child.boxes, child.zhash, g + 1, child_h, child.hdata, key, push)
+                owner = child.zhash % self.n
+                if owner == self.wid:
+                    self.insert(*item)
+                else:
+                    self.outgoing[owner].append(item)
+                    if g + 1 + child_h < self.bound:
+                        rank = (g + 1 + child_h, -g - 1)
+                        handoff = rank if handoff is None else min(handoff, rank)
+            if handoff is not None and (not self.open_list or handoff <= self.open_list[0][:2]):
+                break
+        self.flush()
+
+    def flush(self):
+        """Gửi các lô con đang chờ"""
+        for owner, batch in enumerate(self.outgoing):
+            if batch:
+                self.inboxes[owner].put(("batch", batch))
+                self.sent += 1
+                self.outgoing[owner] = []
+
+    def handle(self, message):
+        """Xử lý một thông điệp; trả về False khi được yêu cầu dừng"""
+        kind = message[0]
+        if kind == "batch":
+            self.received += 1
+            for item in message[1]:
+                self.insert(*item)
+        elif kind == "bound":
+            self.bound = min(self.bound, message[1])
+        elif kind == "probe":
+            self.control.put(("probe", self.wid, message[1], self.sent, self.received, self.idle(),
+                              self.expanded, self.generated, len(self.open_list)))
+        elif kind == "trace":
+            self.control.put(("parent", message[1], self.parents[message[1]]))
+        elif kind == "stop":
+            return False
+        return True
+
+    def run(self):
+        """Vòng lặp chính: đọc thông điệp, mở rộng khi còn việc, chờ khi rảnh"""
+        inbox = self.inboxes[self.wid]
+        while True:
+            if self.idle():
+                if not self.handle(inbox.get()):
+                    return
+                continue
+            while True:
+                try:
+                    message = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if not self.handle(message):
+                    return
+            self.expand()
+
+
+def _worker_main(wid, n, base_map, goals, start, inboxes, control):
+    """Điểm vào của tiến trình worker"""
+    level = Level(base_map, goals)
+    worker = _Worker(wid, n, level, inboxes, control)
+    if start[2] % n == wid:
+        worker.insert(*start)
+    try:
+        worker.run()
+    finally:
+        # Dữ liệu còn trong hàng đợi không còn cần, đừng chờ gửi hết khi thoát
+        for inbox in inboxes:
+            inbox.cancel_join_thread()
+        control.cancel_join_thread()
+
+
+def hda_star(level, player, boxes, workers=None, stats=None):
+    """
+    HDA* theo số lần đẩy với workers tiến trình (mặc định: số CPU)
+    player, boxes: vị trí (x, y) ban đầu; trả về chuỗi di chuyển hoặc None
+    stats: SearchStats (search_stats.py), bộ đếm cộng từ mọi worker sau mỗi đợt probe;
+    báo cáo tiến độ với frontier là tổng kích thước các open list; giới hạn bộ nhớ
+    của ngân sách chỉ tính RSS của tiến trình điều phối, không gồm các worker
+    """
+    stats = stats or SearchStats()
+    n = workers or os.cpu_count() or 1
+    start_player = level.index(player)
+    start_boxes = level.box_mask(boxes)
+    _, lowest = reachable(level, start_boxes, start_player)
+    start = CompactState(lowest, start_boxes, level.zobrist(lowest, start_boxes))
+    h = MatchingHeuristic().evaluate(level, start)  # đặt start.hdata
+    if h == float("inf"):
+        return None
+    if start_boxes == level.goal_mask:
+        return ""
+
+    context = multiprocessing.get_context("spawn")
+    inboxes = [context.Queue() for _ in range(n)]
+    control = context.Queue()
+    item = (lowest, start_boxes, start.zhash, 0, h, start.hdata, None, None)
+    processes = [context.Process(target=_worker_main, daemon=True,
+                                 args=(wid, n, level.base_map, level.goals, item, inboxes, control))
+                 for wid in range(n)]
+    for process in processes:
+        process.start()
+
+    try:
+        best = _coordinate(n, inboxes, control, stats, processes)
+        if best is None:
+            return None
+        pushes = _trace(n, inboxes, control, best[1], level, processes)
+    finally:
+        for inbox in inboxes:
+            inbox.put(("stop",))
+        for process in processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+    return pushes_to_moves(level, start_player, start_boxes, pushes)
+
+
+def _receive(control, processes):
+    """Đọc một thông điệp từ các worker; báo lỗi nếu có worker đã chết (không bao giờ trả lời)"""
+    while True:
+        try:
+            return control.get(timeout=1)
+        except queue.Empty:
+            if not all(process.is_alive() for process in processes):
+                raise RuntimeError("An HDA* worker process exited unexpectedly")
+
+
+def _coordinate(n, inboxes, control, stats, processes):
+    """
+    Chờ tới khi tìm kiếm kết thúc (four-counter), phát cận trên khi có lời giải mới
+    Trả về (g, khóa) của trạng thái đích tốt nhất hoặc None
+    """
+    best = None
+    previous = None
+    wave = 0
+    while True:
+        wave += 1
+        for inbox in inboxes:
+            inbox.put(("probe", wave))
+        replies = {}
+        while len(replies) < n:
+            message = _receive(control, processes)
+            if message[0] == "goal":
+                _, _, g, key = message
+                # Worker tìm thấy đã tự phát cận trên cho các worker khác
+                if best is None or g < best[0]:
+                    best = (g, key)
+            elif message[0] == "probe" and message[2] == wave:
+                replies[message[1]] = message[3:]
+        sent = sum(reply[0] for reply in replies.values())
+        received = sum(reply[1] for reply in replies.values())
+        stats.expanded = sum(reply[3] for reply in replies.values())
+        stats.generated = sum(reply[4] for reply in replies.values())
+        if stats.expanded >= stats.report_at:
+            stats.report(sum(reply[5] for reply in replies.values()), best and best[0])
+        counters = tuple(reply[:2] for _, reply in sorted(replies.items()))
+        if all(reply[2] for reply in replies.values()) and sent == received:
+            if counters == previous:
+                return best
+            previous = counters
+        else:
+            previous = None
+        time.sleep(PROBE_INTERVAL)
+
+
+def _trace(n, inboxes, control, key, level, processes):
+    """Dựng lại các lần đẩy bằng cách hỏi worker sở hữu từng trạng thái trên đường về gốc"""
+    pushes = []
+    while True:
+        player, boxes = key
+        owner = level.zobrist(player, boxes) % n
+        inboxes[owner].put(("trace", key))
+        while True:
+            message = _receive(control, processes)
+            if message[0] == "parent" and message[1] == key:
+                break
+        parent, push = message[2]
+        if parent is None:
+            break
+        pushes.append(push)
+        key = parent
+    pushes.reverse()
+    return pushes
@@ -0,0 +1,183 @@
+"""
+Các heuristic cho A* trên trạng thái gọn (solver_core.CompactState)
+
+Heuristic được tính tăng dần: trạng thái con kế thừa các thành phần heuristic
+(state.hdata) của trạng thái cha và chỉ tính lại phần của hộp vừa di chuyển.
+Bước đi thường (không đẩy hộp) dùng lại nguyên phần của cha.
+Mỗi heuristic có hai phương thức:
+- evaluate(level, state): tính đầy đủ, dùng cho trạng thái đầu
+- update(level, parent, child): tính từ thành phần của parent
+Thuộc tính SCALE: hệ số nhân để (g + h) * SCALE luôn là số nguyên, dùng làm khóa
+cho open list bucket queue của A* (bucket_queue.py)
+"""
+from level_analysis import INF, iter_bits
+
+
+def moved_box(parent, child):
+    """
+    Tìm hộp đã di chuyển giữa parent và child
+    Trả về (ô cũ, ô mới) hoặc None nếu chỉ là bước đi thường
+    """
+    moved = parent.boxes ^ child.boxes
+    if not moved:
+        return None
+    src = (moved & parent.boxes).bit_length() - 1
+    dst = (moved & child.boxes).bit_length() - 1
+    return src, dst
+
+
+class ManhattanHeuristic:
+    """
+    Heuristic Manhattan của bản gốc (Solver.heuristic_func trước đây) trên trạng thái gọn:
+    1. Tổng khoảng cách Manhattan từ mỗi hộp đến goal gần nhất
+    2. 0.1 * khoảng cách từ người chơi đến hộp gần nhất
+    Không cần phạt deadlock: trạng thái đẩy hộp vào ô chết đã bị loại khi sinh con
+    Không admissible: nhiều hộp có thể cùng nhắm một goal
+    hdata = tổng khoảng cách của các hộp (phần 1)
+    """
+    # Phần 2 có bước 0.1
+    SCALE = 10
+
+    def evaluate(self, level, state):
+        """Tính đầy đủ heuristic cho state"""
+        state.hdata = sum(level.nearest_goal[box] for box in iter_bits(state.boxes))
+        return state.hdata + self.player_term(level, state)
+
+    def update(self, level, parent, child):
+        """Tính heuristic cho child từ phần đã tính của parent"""
+        if parent.hdata is None:
+            return self.evaluate(level, child)
+        moved = moved_box(parent, child)
+        if moved is None:
+            child.hdata = parent.hdata
+        else:
+            src, dst = moved
+            child.hdata = parent.hdata - level.nearest_goal[src] + level.nearest_goal[dst]
+        return child.hdata + self.player_term(level, child)
+
+    def player_term(self, level, state):
+        """0.1 * khoảng cách Manhattan từ người chơi đến hộp gần nhất"""
+        coords = level.coords
+        px, py = coords[state.player]
+        min_player_to_box = float("inf")
+        for box in iter_bits(state.boxes):
+            bx, by = coords[box]
+            min_player_to_box = min(min_player_to_box, abs(px - bx) + abs(py - by))
+        return min_player_to_box * 0.1
+
+
+class MatchingHeuristic:
+    """
+    Heuristic ghép cặp tối thiểu (admissible):
+    Ghép mỗi hộp với một goal riêng sao cho tổng số lần đẩy (Level.push_distance,
+    có tính tường) là nhỏ nhất, giải bằng thuật toán Hungarian
+    Trả về float("inf") nếu không có cách ghép nào - trạng thái deadlock
+
+    hdata = (rows, u, v, p): ô hộp của từng hàng, thế vị hàng/cột và cách ghép.
+    Khi một hộp di chuyển, chỉ hàng của hộp đó thay đổi: khôi phục thế vị cho
+    hàng đó rồi tìm một đường tăng duy nhất, O(n^2) thay vì O(n^3)
+    """
+    # Tổng số lần đẩy luôn là số nguyên
+    SCALE = 1
+
+    def evaluate(self, level, state):
+        """Giải Hungarian đầy đủ cho state"""
+        rows = tuple(iter_bits(state.boxes))
+        m = len(level.goal_cells)
+        if len(rows) > m:
+            # Nhiều hộp hơn goal: không bao giờ giải được
+            state.hdata = None
+            return float("inf")
+        u = [0] * (len(rows) + 1)
+        v = [0] * (m + 1)
+        p = [0] * (m + 1)
+        for i in range(1, len(rows) + 1):
+            augment(level.push_distance, rows, u, v, p, i)
+        state.hdata = (rows, u, v, p)
+        return matching_cost(level.push_distance, rows, p)
+
+    def update(self, level, parent, child):
+        """Cập nhật cách ghép của parent cho hộp vừa di chuyển"""
+        if parent.hdata is None:
+            return self.evaluate(level, child)
+        moved = moved_box(parent, child)
+        if moved is None:
+            child.hdata = parent.hdata
+            return parent.heuristic
+
+        src, dst = moved
+        rows, u, v, p = parent.hdata
+        if len(rows) != len(v) - 1:
+            # Ít hộp hơn goal: cột bị bỏ trống có thể phá điều kiện tối ưu, tính lại
+            return self.evaluate(level, child)
+        i = rows.index(src) + 1
+        rows = rows[:i - 1] + (dst,) + rows[i:]
+        u = list(u)
+        v = list(v)
+        p = list(p)
+        # Bỏ cặp ghép cũ của hàng i và hạ thế vị để mọi chi phí rút gọn vẫn >= 0
+        for j in range(1, len(p)):
+            if p[j] == i:
+                p[j] = 0
+        push_distance = level.push_distance
+        u[i] = min(push_distance[j - 1][dst] - v[j] for j in range(1, len(v)))
+        augment(push_distance, rows, u, v, p, i)
+        child.hdata = (rows, u, v, p)
+        return matching_cost(push_distance, rows, p)
+
+
+def augment(push_distance, rows, u, v, p, i):
+    """
+    Một bước của thuật toán Hungarian: tìm đường tăng từ hàng i (đánh số từ 1)
+    Chi phí hàng r, cột j là push_distance[j - 1][rows[r - 1]]
+    u, v: thế vị của hàng/cột; p[j] = hàng đang ghép với cột j (0 nếu trống)
+    """
+    m = len(v) - 1
+    way = [0] * (m + 1)
+    minv = [float("inf")] * (m + 1)
+    used = [False] * (m + 1)
+    p[0] = i
+    j0 = 0
+    while True:
+        used[j0] = True
+        i0 = p[j0]
+        box = rows[i0 - 1]
+        delta = float("inf")
+        j1 = 0
+        for j in range(1, m + 1):
+            if not used[j]:
+                cur = push_distance[j - 1][box] - u[i0] - v[j]
+                if cur < minv[j]:
+                    minv[j] = cur
+                    way[j] = j0
+                if minv[j] < delta:
+                    delta = minv[j]
+                    j1 = j
+        for j in range(m + 1):
+            if used[j]:
+                u[p[j]] += delta
+                v[j] -= delta
+            else:
+                minv[j] -= delta
+        j0 = j1
+        if p[j0] == 0:
+            break
+    # Lật các cạnh trên đường tăng
+    while j0:
+        j1 = way[j0]
+        p[j0] = p[j1]
+        j0 = j1
+    p[0] = 0
+
+
+def matching_cost(push_distance, rows, p):
+    """Tổng số lần đẩy của cách ghép p; float("inf") nếu phải dùng cặp không tới được"""
+    total = sum(push_distance[j - 1][rows[p[j] - 1]] for j in range(1, len(p)) if p[j])
+    return float("inf") if total >= INF else total
+
+
+# Bảng tra tên heuristic -> đối tượng, dùng cho Solver.a_star(..., heuristic=tên)
+HEURISTICS = {
+    "manhattan": ManhattanHeuristic(),
+    "matching": MatchingHeuristic(),
+}
@@ -0,0 +1,120 @@
+"""
+IDA* (Iterative Deepening A*) trên không gian đẩy hộp
+
+- Bộ nhớ tỉ lệ với độ sâu: chỉ giữ đường đi hiện tại (và hdata của heuristic
+  dọc theo đường đó), không giữ toàn bộ trạng thái đã thăm như BFS / A*
+- Bảng chuyển vị (transposition table) kích thước cố định, đánh chỉ số bằng khóa
+  Zobrist, để cắt các trạng thái đã duyệt trong cùng vòng lặp với g không lớn hơn
+- Thứ tự lần đẩy: heuristic nhỏ trước, cùng heuristic thì hộp gần goal hơn trước
+Heuristic ghép cặp tối thiểu (admissible) -> lời giải ít lần đẩy nhất.
+"""
+from heuristics import MatchingHeuristic
+from search_stats import SearchStats
+from solver_core import CompactState, pushes_to_moves, push_successors, reachable
+
+# Mặc định 2^20 ô trong bảng chuyển vị
+DEFAULT_TABLE_BITS = 20
+
+
+class TranspositionTable:
+    """
+    Bảng băm kích thước cố định, mỗi ô lưu một trạng thái:
+    (khóa Zobrist, người chơi, bitboard hộp, g, vòng lặp)
+    Chính sách thay thế: ô trống hoặc của vòng lặp cũ luôn bị ghi đè;
+    trong cùng vòng lặp giữ trạng thái có g nhỏ hơn (gần gốc, cắt được nhiều hơn)
+    """
+
+    def __init__(self, bits=DEFAULT_TABLE_BITS):
+        self.mask = (1 << bits) - 1
+        self.slots = [None] * (1 << bits)
+
+    def should_prune(self, state, g, iteration):
+        """Trạng thái đã được duyệt trong vòng này với g không lớn hơn -> cắt"""
+        entry = self.slots[state.zhash & self.mask]
+        return (entry is not None and entry[4] == iteration and entry[3] <= g
+                and entry[0] == state.zhash and entry[1] == state.player and entry[2] == state.boxes)
+
+    def store(self, state, g, iteration):
+        """Ghi trạng thái theo chính sách thay thế"""
+        slot = state.zhash & self.mask
+        entry = self.slots[slot]
+        if entry is None or entry[4] != iteration or g <= entry[3]:
+            self.slots[slot] = (state.zhash, state.player, state.boxes, g, iteration)
+
+
+def ida_star(level, player, boxes, table_bits=DEFAULT_TABLE_BITS, heuristic=None, stats=None):
+    """
+    IDA* theo số lần đẩy
+    player, boxes: vị trí (x, y) ban đầu; trả về chuỗi di chuyển hoặc None
+    stats: SearchStats (search_stats.py), bộ đếm cộng dồn qua mọi vòng lặp;
+    khi báo cáo tiến độ, frontier là độ sâu hiện tại và best_f là ngưỡng của vòng
+    """
+    stats = stats or SearchStats()
+    heuristic = heuristic or MatchingHeuristic()
+    start_player = level.index(player)
+    start_boxes = level.box_mask(boxes)
+    _, lowest = reachable(level, start_boxes, start_player)
+    start = CompactState(lowest, start_boxes, level.zobrist(lowest, start_boxes))
+    start.heuristic = heuristic.evaluate(level, start)
+    if start.heuristic == float("inf"):
+        return None
+
+    table = TranspositionTable(table_bits)
+    threshold = start.heuristic
+    iteration = 0
+    pushes = []
+    # Các công đoạn được đo thời gian khi stats.timing bật
+    successors = stats.timed("successors", push_successors)
+    update = stats.timed("heuristic", heuristic.update)
+    rebuild = stats.timed("rebuild", pushes_to_moves)
+
+    while True:
+        iteration += 1
+        result = _search(level, successors, update, table, start, 0, threshold, iteration, pushes, stats)
+        if result is True:
+            return rebuild(level, start_player, start_boxes, pushes)
+        if result == float("inf"):
+            return None  # Đã duyệt hết, không có lời giải
+        threshold = result
+
+
+def _search(level, successors, update, table, state, g, threshold, iteration, pushes, stats):
+    """
+    DFS giới hạn bởi threshold
+    Trả về True nếu tìm thấy lời giải (pushes chứa các lần đẩy),
+    ngược lại trả về f nhỏ nhất vượt ngưỡng để làm ngưỡng cho vòng sau
+    """
+    f = g + state.heuristic
+    if f > threshold:
+        return f
+    if state.boxes == level.goal_mask:
+        return True
+    if table.should_prune(state, g, iteration):
+        stats.duplicates += 1
+        return float("inf")
+    table.store(state, g, iteration)
+    stats.expanded += 1
+    if stats.expanded >= stats.report_at:
+        stats.report(g, threshold)
+
+    children = []
+    generated = successors(level, state)
+    stats.generated += len(generated)
+    for push, child in generated:
+        child.heuristic = update(level, state, child)
+        if child.heuristic != float("inf"):
+            box, d = push
+            moved_to = box + level.offsets[d]
+            children.append((child.heuristic, level.nearest_goal_pushes[moved_to], push, child))
+    # Sắp thứ tự: lần đẩy làm heuristic nhỏ / đưa hộp về gần goal được thử trước
+    children.sort(key=lambda item: (item[0], item[1]))
+
+    minimum = float("inf")
+    for _, _, push, child in children:
+        pushes.append(push)
+        result = _search(level, successors, update, table, child, g + 1, threshold, iteration, pushes, stats)
+        if result is True:
+            return True
+        pushes.pop()
+        minimum = min(minimum, result)
+    return minimum
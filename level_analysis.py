@@ -0,0 +1,326 @@
+"""
+Phân tích tĩnh một màn chơi Sokoban
+Chạy một lần khi load level, kết quả dùng chung cho mọi trạng thái trong lúc tìm kiếm
+"""
+import random
+from collections import deque
+
+# Thứ tự hướng: Lên, Xuống, Trái, Phải
+LETTERS = "UDLR"
+
+# Khoảng cách "vô cùng" dạng số nguyên cho cặp hộp - goal không đẩy tới được
+INF = 10 ** 6
+
+# Seed cố định để bảng Zobrist (và do đó thứ tự duyệt) lặp lại được giữa các lần chạy
+ZOBRIST_SEED = 0x50C0BA
+
+
+def iter_bits(mask):
+    """Duyệt các chỉ số ô có bit bằng 1 trong bitboard"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Level:
+    """
+    Bản đồ đã được làm phẳng thành mảng một chiều
+    Ô (x, y) có chỉ số (y + 1) * width + x; bản đồ được bọc thêm một hàng tường
+    phía trên, phía dưới và một cột tường bên phải nên mọi ô lân cận đều hợp lệ
+    """
+
+    def __init__(self, base_map, goals):
+        if not any(base_map):
+            raise ValueError("empty level")
+        self.base_map = base_map
+        self.goals = frozenset(goals)
+        self.width = max(len(row) for row in base_map) + 1
+        self.size = self.width * (len(base_map) + 2)
+
+        # 1 = tường (kể cả phần đệm bên ngoài bản đồ), 0 = ô đi được
+        self.walls = bytearray(b"\x01" * self.size)
+        for y, row in enumerate(base_map):
+            for x, ch in enumerate(row):
+                if ch != "#":
+                    self.walls[self.index((x, y))] = 0
+
+        # Độ lệch chỉ số cho 4 hướng, cùng thứ tự với LETTERS
+        self.offsets = (-self.width, self.width, -1, 1)
+        # Tọa độ (x, y) của từng ô để tính khoảng cách Manhattan
+        self.coords = [self.position(i) for i in range(self.size)]
+
+        self.goal_cells = [self.index(g) for g in sorted(self.goals)]
+        self.goal_mask = self.box_mask(self.goals)
+
+        # Khoảng cách Manhattan từ mỗi ô đến goal gần nhất (bỏ qua tường)
+        self.nearest_goal = [
+            min((abs(x - gx) + abs(y - gy) for gx, gy in self.goals), default=0)
+            for x, y in self.coords
+        ]
+
+        # push_distance[g][c]: số lần đẩy ít nhất để đưa hộp từ ô c tới goal thứ g
+        # trên bản đồ tĩnh (tính đến tường và chỗ đứng của người chơi, bỏ qua hộp khác)
+        self.push_distance = [self.compute_pull_distances(goal) for goal in self.goal_cells]
+
+        # Số lần đẩy ít nhất từ mỗi ô tới goal gần nhất (dùng để sắp thứ tự lần đẩy)
+        self.nearest_goal_pushes = [
+            min((dist[i] for dist in self.push_distance), default=INF)
+            for i in range(self.size)
+        ]
+
+        # Ô chết tĩnh: hộp bị đẩy vào đây thì không bao giờ tới được goal
+        self.dead = self.compute_dead_squares()
+
+        # Bảng Zobrist: mỗi ô có một khóa ngẫu nhiên 64 bit cho hộp và cho người chơi
+        rng = random.Random(ZOBRIST_SEED)
+        self.box_keys = [rng.getrandbits(64) for _ in range(self.size)]
+        self.player_keys = [rng.getrandbits(64) for _ in range(self.size)]
+
+        # Bảng macro (đường hầm, phòng goal), chỉ tính khi tìm kiếm dùng macro
+        self._macros = None
+
+    def index(self, pos):
+        """Chuyển tọa độ (x, y) thành chỉ số ô"""
+        x, y = pos
+        return (y + 1) * self.width + x
+
+    def position(self, idx):
+        """Chuyển chỉ số ô thành tọa độ (x, y)"""
+        y, x = divmod(idx, self.width)
+        return (x, y - 1)
+
+    def box_mask(self, boxes):
+        """Chuyển tập vị trí hộp (x, y) thành bitboard"""
+        mask = 0
+        for box in boxes:
+            mask |= 1 << self.index(box)
+        return mask
+
+    def box_positions(self, mask):
+        """Chuyển bitboard thành frozenset các vị trí hộp (x, y)"""
+        return frozenset(self.coords[i] for i in iter_bits(mask))
+
+    def compute_pull_distances(self, goal):
+        """
+        BFS "kéo" hộp ngược từ một goal (bỏ qua các hộp khác)
+        Kéo hộp từ ô c về ô c - off cần hai ô c - off và c - 2*off đều không phải tường
+        Trả về danh sách số lần đẩy ít nhất từ mỗi ô tới goal (INF nếu không tới được)
+        """
+        walls = self.walls
+        dist = [INF] * self.size
+        dist[goal] = 0
+        q = deque([goal])
+        while q:
+            cell = q.popleft()
+            for off in self.offsets:
+                prev = cell - off
+                if dist[prev] != INF or walls[prev] or walls[prev - off]:
+                    continue
+                dist[prev] = dist[cell] + 1
+                q.append(prev)
+        return dist
+
+    def compute_dead_squares(self):
+        """
+        Ô không phải tường mà không kéo tới được từ goal nào là ô chết
+        (góc, đoạn sát tường không có goal...)
+        Trả về bytearray: 1 = ô chết
+        """
+        walls = self.walls
+        return bytearray(
+            not walls[i] and self.nearest_goal_pushes[i] == INF
+            for i in range(self.size)
+        )
+
+    def macro_tables(self):
+        """Bảng macro của level (MacroTables), tính ở lần dùng đầu tiên rồi giữ lại"""
+        if self._macros is None:
+            self._macros = MacroTables(self)
+        return self._macros
+
+    def zobrist(self, player, mask):
+        """Tính khóa Zobrist đầy đủ cho (người chơi, bitboard hộp)"""
+        zhash = self.player_keys[player]
+        for i in iter_bits(mask):
+            zhash ^= self.box_keys[i]
+        return zhash
+
+
+class MacroTables:
+    """
+    Phân tích tĩnh cho macro move (solver_core.macro_push_successors)
+
+    Đường hầm: tunnels[d][c] = 1 nếu ô c và ô phía sau nó (c - offsets[d]) đều bị tường
+    chặn ở hai bên vuông góc với hướng d, và c không phải goal. Hộp vừa bị đẩy theo hướng
+    d tới ô c thì người chơi kẹt trong hành lang rộng 1 ô phía sau hộp: đẩy tiếp cùng hướng
+    là tiếp nối hợp lý duy nhất, nên cả đoạn được gộp thành một bước.
+
+    Phòng goal: vùng R chứa goal, chỉ nối với phần còn lại của bản đồ qua một ô cửa e
+    (bỏ e thì R tách rời) và không lớn hơn nửa số ô bên trong level. Với mỗi ô vào r0 (ô của R kề e,
+    hộp được đẩy từ e vào r0), thứ tự lấp goal được chọn trước: lần lượt goal xa r0 nhất còn
+    đẩy tới được khi các goal đã lấp là chướng ngại. Chỉ giữ phòng lấp được hết theo thứ tự đó;
+    đường đẩy của từng bước được tính sẵn, người chơi chỉ đi trong R và ô cửa nên không phụ
+    thuộc các hộp bên ngoài.
+    rooms[(r0, d)] = (bitboard R, danh sách bitboard các goal đã lấp trước bước k,
+    danh sách đường đẩy (ô hộp, hướng) của bước k)
+    """
+
+    def __init__(self, level):
+        self.tunnels = [self.compute_tunnels(level, d) for d in range(4)]
+        self.rooms = {}
+        for room, entrance in self.find_goal_rooms(level):
+            for d, off in enumerate(level.offsets):
+                entry = entrance + off
+                if room >> entry & 1:
+                    plan = self.plan_room(level, room, entrance, entry, d)
+                    if plan is not None:
+                        self.rooms[(entry, d)] = plan
+
+    @staticmethod
+    def compute_tunnels(level, d):
+        """Các ô đường hầm theo hướng đẩy d"""
+        walls = level.walls
+        off = level.offsets[d]
+        # Hai hướng vuông góc với d
+        side = 1 if d < 2 else level.width
+        tunnels = bytearray(level.size)
+        for c in range(level.size):
+            behind = c - off
+            if (walls[c] or walls[behind] or c in level.goal_cells
+                    or not (walls[c - side] and walls[c + side])
+                    or not (walls[behind - side] and walls[behind + side])):
+                continue
+            tunnels[c] = 1
+        return tunnels
+
+    @staticmethod
+    def find_goal_rooms(level):
+        """Danh sách (bitboard R, ô cửa) của các phòng goal"""
+        walls = level.walls
+        goal_mask = level.goal_mask
+        # Chỉ xét phần bên trong level: các ô đi tới được từ goal. Người chơi của một level
+        # giải được luôn ở cùng vùng với các goal; khoảng trắng đệm bên ngoài vòng tường
+        # cũng là ô không phải tường nhưng không được tính vào cận kích thước phòng
+        interior = 0
+        for goal in level.goal_cells:
+            if not interior >> goal & 1:
+                interior |= _flood(level, goal, 0)
+        floor = list(iter_bits(interior))
+        rooms = []
+        for entrance in floor:
+            if goal_mask >> entrance & 1:
+                continue
+            # Các vùng liên thông khi bỏ ô cửa
+            blocked = 1 << entrance
+            components = []
+            for off in level.offsets:
+                start = entrance + off
+                if walls[start] or blocked >> start & 1 or any(comp >> start & 1 for comp in components):
+                    continue
+                components.append(_flood(level, start, blocked))
+            if len(components) < 2:
+                continue
+            for comp in components:
+                if comp & goal_mask and bin(comp).count("1") <= len(floor) // 2:
+                    rooms.append((comp, entrance))
+        return rooms
+
+    @staticmethod
+    def plan_room(level, room, entrance, entry, d):
+        """Thứ tự lấp goal và đường đẩy từng bước khi hộp vào phòng qua entry theo hướng d"""
+        goals = [g for g in level.goal_cells if room >> g & 1]
+        # Khoảng cách đi bộ trong phòng từ ô vào, để ưu tiên goal sâu nhất
+        depth = _walk_distances(level, entry, room)
+        # Người chơi chỉ được đi trong phòng và ô cửa
+        area = room | 1 << entrance
+        filled = 0
+        prefixes, routes = [], []
+        remaining = sorted(goals, key=lambda g: -depth.get(g, -1))
+        while remaining:
+            for goal in remaining:
+                route = _push_route(level, area, filled, entry, entrance, d, goal)
+                if route is not None:
+                    break
+            else:
+                return None  # Không lấp hết được theo thứ tự này, không dùng macro cho phòng
+            prefixes.append(filled)
+            routes.append(tuple(route))
+            filled |= 1 << goal
+            remaining.remove(goal)
+        return room, prefixes, routes
+
+
+def _flood(level, start, blocked, area=None):
+    """Bitboard các ô đi tới được từ start, không qua tường / ô trong blocked, chỉ trong area (nếu có)"""
+    walls = level.walls
+    seen = 1 << start
+    stack = [start]
+    while stack:
+        cell = stack.pop()
+        for off in level.offsets:
+            nxt = cell + off
+            if walls[nxt] or (blocked | seen) >> nxt & 1 or (area is not None and not area >> nxt & 1):
+                continue
+            seen |= 1 << nxt
+            stack.append(nxt)
+    return seen
+
+
+def _walk_distances(level, start, area):
+    """Khoảng cách đi bộ từ start tới các ô trong area"""
+    dist = {start: 0}
+    q = deque([start])
+    while q:
+        cell = q.popleft()
+        for off in level.offsets:
+            nxt = cell + off
+            if nxt not in dist and area >> nxt & 1:
+                dist[nxt] = dist[cell] + 1
+                q.append(nxt)
+    return dist
+
+
+def _push_route(level, area, obstacles, box, player, d, target):
+    """
+    Đường đẩy ngắn nhất một hộp từ box tới target: lần đẩy đầu tiên là từ ô cửa vào box
+    (đã thực hiện), người chơi đứng ở player; hộp và người chơi chỉ ở trong area,
+    obstacles là bitboard các hộp đứng yên
+    Trả về danh sách (ô hộp, hướng) gồm cả lần đẩy vào phòng, hoặc None
+    """
+    first = (player, d)
+    if box == target:
+        return [first]
+    dead = level.dead
+    offsets = level.offsets
+    start = (box, _lowest(_flood(level, player, obstacles | 1 << box, area)))
+    parents = {start: None}
+    q = deque([start])
+    while q:
+        key = q.popleft()
+        cell, low = key
+        seen = _flood(level, low, obstacles | 1 << cell, area)
+        for dd, off in enumerate(offsets):
+            nxt = cell + off
+            if (not seen >> (cell - off) & 1 or not area >> nxt & 1
+                    or obstacles >> nxt & 1 or dead[nxt]):
+                continue
+            child = (nxt, _lowest(_flood(level, cell, obstacles | 1 << nxt, area)))
+            if child in parents:
+                continue
+            parents[child] = (key, (cell, dd))
+            if nxt == target:
+                route = []
+                while parents[child] is not None:
+                    child, push = parents[child]
+                    route.append(push)
+                route.append(first)
+                route.reverse()
+                return route
+            q.append(child)
+    return None
+
+
+def _lowest(mask):
+    """Ô có chỉ số nhỏ nhất trong bitboard"""
+    return (mask & -mask).bit_length() - 1
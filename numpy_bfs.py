@@ -0,0 +1,166 @@
+"""
+BFS theo từng lớp (level-synchronous) vector hóa bằng NumPy
+
+Mỗi trạng thái là một hàng số nguyên độ rộng cố định: [người chơi, hộp_1, ..., hộp_n]
+(chỉ số ô trên Level, các hộp được sắp tăng dần để mỗi trạng thái có đúng một cách ghi).
+Cả một lớp frontier được mở rộng cùng lúc:
+- Trạng thái con sinh bằng phép tra bảng vector hóa (tường, ô chết, độ lệch 4 hướng)
+- Trùng lặp trong lớp được loại bằng np.unique, trùng với các lớp trước được loại
+  bằng cách so với mảng khóa đã sắp xếp của mọi trạng thái đã thăm
+- Mỗi lớp giữ chỉ số trạng thái cha và hướng đi để dựng lại đường đi
+
+Tìm theo từng bước đi như Solver.bfs nên lời giải ít bước nhất.
+NumPy là phụ thuộc tùy chọn: chỉ cần khi dùng engine này.
+"""
+try:
+    import numpy as np
+except ImportError:  # NumPy không bắt buộc với phần còn lại của chương trình
+    np = None
+
+from level_analysis import LETTERS
+from search_stats import SearchStats
+
+
+def _require_numpy():
+    """Báo lỗi rõ ràng nếu chưa cài NumPy"""
+    if np is None:
+        raise ImportError("The vectorized BFS engine requires NumPy (pip install numpy)")
+
+
+def _row_keys(rows, bits):
+    """
+    Mỗi hàng thành một khóa để sắp xếp / so sánh cả hàng một lần
+    Nếu cả hàng vừa 64 bit (bits bit mỗi ô) thì ghép thành uint64, so sánh nhanh nhất;
+    nếu không thì xem hàng như một khối byte (np.void)
+    """
+    if bits * rows.shape[1] <= 64:
+        keys = np.zeros(rows.shape[0], dtype=np.uint64)
+        for col in range(rows.shape[1]):
+            keys = (keys << np.uint64(bits)) | rows[:, col].astype(np.uint64)
+        return keys
+    rows = np.ascontiguousarray(rows)
+    return rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).ravel()
+
+
+def expand_layer(level, frontier, walls, dead, offsets):
+    """
+    Sinh toàn bộ trạng thái con của một lớp
+    Trả về (các hàng con, chỉ số cha trong frontier, hướng đi)
+    """
+    players = frontier[:, 0].astype(np.int32)
+    boxes = frontier[:, 1:].astype(np.int32)
+    children, parents, moves = [], [], []
+
+    for d, off in enumerate(offsets):
+        new_players = players + off
+        ok = walls[new_players] == 0
+
+        # hit[i, k]: người chơi ở trạng thái i bước vào hộp thứ k -> đẩy hộp
+        hit = boxes == new_players[:, None]
+        pushing = hit.any(axis=1)
+        targets = new_players + off
+        blocked = (walls[targets] != 0) | dead[targets] | (boxes == targets[:, None]).any(axis=1)
+        ok &= ~(pushing & blocked)
+
+        idx = np.nonzero(ok)[0]
+        if idx.size == 0:
+            continue
+        new_boxes = np.where(hit[idx], targets[idx, None], boxes[idx])
+        new_boxes.sort(axis=1)
+        children.append(np.column_stack([new_players[idx], new_boxes]).astype(frontier.dtype))
+        parents.append(idx)
+        moves.append(np.full(idx.size, d, dtype=np.uint8))
+
+    if not children:
+        empty = np.empty((0, frontier.shape[1]), dtype=frontier.dtype)
+        return empty, np.empty(0, dtype=np.intp), np.empty(0, dtype=np.uint8)
+    return np.concatenate(children), np.concatenate(parents), np.concatenate(moves)
+
+
+def bfs(level, player, boxes, stats=None):
+    """
+    BFS vector hóa theo từng bước đi
+    player, boxes: vị trí (x, y) ban đầu; trả về chuỗi di chuyển hoặc None
+    stats: SearchStats (search_stats.py): cộng số trạng thái đã mở rộng / sinh ra / trùng lặp;
+    mỗi lớp được mở rộng theo từng đoạn kết thúc ở ngưỡng report_at (như a_star) nên báo cáo
+    tiến độ / kiểm tra ngân sách không phải chờ hết một lớp lớn; frontier khi báo cáo là số
+    trạng thái chưa mở rộng của lớp hiện tại cộng số con đã sinh
+    """
+    _require_numpy()
+    stats = stats or SearchStats()
+    expand = stats.timed("expand", expand_layer)
+    unique = stats.timed("unique", np.unique)
+    # uint16 đủ cho bản đồ dưới 65536 ô, giảm một nửa bộ nhớ mỗi hàng so với int32
+    dtype = np.uint16 if level.size < 1 << 16 else np.int32
+    walls = np.frombuffer(bytes(level.walls), dtype=np.uint8)
+    dead = np.frombuffer(bytes(level.dead), dtype=np.uint8).astype(bool)
+    offsets = [int(off) for off in level.offsets]
+    goal_row = np.array(sorted(level.goal_cells), dtype=dtype)
+    if len(goal_row) != len(boxes):
+        return None
+
+    frontier = np.array([[level.index(player)] + sorted(level.index(b) for b in boxes)], dtype=dtype)
+    bits = (level.size - 1).bit_length()
+    # Khóa của mọi trạng thái đã thăm, luôn được giữ ở dạng đã sắp xếp
+    seen = _row_keys(frontier, bits)
+    # Mỗi lớp: (chỉ số cha ở lớp trước, hướng đi) để truy vết đường đi
+    layers = []
+
+    while frontier.size:
+        solved = np.nonzero((frontier[:, 1:] == goal_row).all(axis=1))[0]
+        if solved.size:
+            return _rebuild(layers, int(solved[0]))
+
+        children, parents, moves = _expand_chunked(level, frontier, walls, dead, offsets, expand, stats, len(layers))
+        # Bỏ trùng trong lớp (giữ lần xuất hiện đầu tiên); np.unique trả về khóa đã sắp xếp
+        keys, first = unique(_row_keys(children, bits), return_index=True)
+        # Trộn với các lớp trước: tìm vị trí chèn bằng tìm kiếm nhị phân,
+        # chỉ sắp xếp lớp mới chứ không sắp xếp lại toàn bộ seen
+        pos = np.searchsorted(seen, keys)
+        found = pos < seen.size
+        found[found] = seen[pos[found]] == keys[found]
+        fresh = ~found
+        seen = np.insert(seen, pos[fresh], keys[fresh])
+        first = np.sort(first[fresh])
+
+        frontier = children[first]
+        layers.append((parents[first], moves[first]))
+        stats.duplicates += children.shape[0] - frontier.shape[0]
+
+    return None
+
+
+def _expand_chunked(level, frontier, walls, dead, offsets, expand, stats, depth):
+    """
+    Mở rộng một lớp theo từng đoạn hàng, mỗi đoạn dừng ở ngưỡng report_at của stats
+    để báo cáo / kiểm tra ngân sách giữa lớp (depth: số lớp đã xong, báo cáo như best_f);
+    trả về như expand_layer cho cả lớp
+    """
+    total = frontier.shape[0]
+    chunks = []
+    generated = 0
+    start = 0
+    while start < total:
+        # report_at là vô cùng khi không có callback / ngân sách: cả lớp là một đoạn
+        end = min(total, start + max(1, stats.report_at - stats.expanded))
+        children, parents, moves = expand(level, frontier[start:end], walls, dead, offsets)
+        chunks.append((children, parents + start, moves))
+        stats.expanded += end - start
+        stats.generated += children.shape[0]
+        generated += children.shape[0]
+        start = end
+        if stats.expanded >= stats.report_at:
+            stats.report(total - start + generated, depth)
+    if len(chunks) == 1:
+        return chunks[0]
+    return tuple(np.concatenate(parts) for parts in zip(*chunks))
+
+
+def _rebuild(layers, index):
+    """Truy vết từ trạng thái index của lớp cuối về trạng thái đầu"""
+    letters = []
+    for parents, moves in reversed(layers):
+        letters.append(LETTERS[moves[index]])
+        index = int(parents[index])
+    letters.reverse()
+    return "".join(letters)
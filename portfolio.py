@@ -0,0 +1,125 @@
+"""
+Chạy đua nhiều cấu hình solver (portfolio racing)
+
+Mỗi cấu hình (BFS, A* với các heuristic khác nhau, greedy, IDA*) chạy trong một
+tiến trình riêng trên cùng level. Kết quả đầu tiên gửi về được dùng ngay, các
+tiến trình còn lại bị dừng. Mọi cấu hình đều duyệt hết không gian trạng thái nếu
+cần, nên "không có lời giải" từ bất kỳ cấu hình nào cũng là kết luận chắc chắn.
+
+Tiến trình con được tạo bằng "spawn" (giống nhau trên mọi hệ điều hành, an toàn
+khi tiến trình cha đang chạy Tkinter); mỗi tiến trình tự phân tích Level.
+"""
+import multiprocessing
+import queue
+import time
+
+import bidirectional
+import ida_star
+import solver_core
+from heuristics import HEURISTICS
+from level_analysis import Level
+from search_stats import SearchStats
+
+# Tên cấu hình -> (hàm giải (level, player, boxes, stats), lời giải tối ưu theo tiêu chí nào)
+# Tiêu chí None: lời giải không đảm bảo tối ưu
+PORTFOLIO = {
+    "bfs": (lambda level, player, boxes, stats: solver_core.bfs(level, player, boxes, False, stats), "moves"),
+    "bfs-push": (lambda level, player, boxes, stats: solver_core.bfs(level, player, boxes, True, stats), "pushes"),
+    "astar-push": (lambda level, player, boxes, stats: solver_core.a_star(
+        level, player, boxes, True, HEURISTICS["manhattan"], stats), None),
+    "astar-push-matching": (lambda level, player, boxes, stats: solver_core.a_star(
+        level, player, boxes, True, HEURISTICS["matching"], stats), "pushes"),
+    "greedy-push": (lambda level, player, boxes, stats: solver_core.greedy(
+        level, player, boxes, True, HEURISTICS["matching"], stats), None),
+    "idastar": (lambda level, player, boxes, stats: ida_star.ida_star(level, player, boxes, stats=stats), "pushes"),
+    "bidirectional": (lambda level, player, boxes, stats: bidirectional.bidirectional(
+        level, player, boxes, stats), "pushes"),
+}
+
+DEFAULT_METHODS = ("bfs", "astar-push", "astar-push-matching", "greedy-push", "idastar")
+
+# Chu kỳ kiểm tra tiến trình con còn sống khi chờ kết quả (giây)
+POLL_INTERVAL = 0.1
+
+
+class RaceResult:
+    """Kết quả của cấu hình về đích đầu tiên"""
+
+    def __init__(self, method, moves, expanded, elapsed):
+        self.method = method
+        # Chuỗi di chuyển, None nếu đã chứng minh level không có lời giải
+        self.moves = moves
+        self.expanded = expanded
+        self.elapsed = elapsed
+        # Tiêu chí tối ưu của cấu hình: "moves", "pushes" hoặc None
+        self.optimal = PORTFOLIO[method][1]
+
+    def quality(self):
+        """Nhãn chất lượng lời giải để hiển thị"""
+        if self.optimal is None:
+            return "not guaranteed optimal"
+        return f"optimal ({self.optimal})"
+
+
+def _worker(method, base_map, goals, player, boxes, results):
+    """Tiến trình con: giải bằng một cấu hình rồi gửi (tên, chuỗi di chuyển, số nút, lỗi)"""
+    try:
+        level = Level(base_map, goals)
+        stats = SearchStats()
+        moves = PORTFOLIO[method][0](level, player, boxes, stats)
+        results.put((method, moves, stats.expanded, None))
+    except Exception as exc:
+        results.put((method, None, 0, f"{type(exc).__name__}: {exc}"))
+
+
+def race(base_map, goals, player, boxes, methods=DEFAULT_METHODS, timeout=None, cancel=None):
+    """
+    Chạy đồng thời các cấu hình trong methods, trả về RaceResult của cấu hình xong trước
+    Trả về None nếu hết timeout (giây) hoặc cancel (search_stats.CancelToken) bị bật
+    trước khi có kết quả
+    Các tiến trình còn lại luôn bị dừng trước khi hàm trả về
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    workers = [context.Process(target=_worker, args=(method, base_map, goals, player, boxes, results), daemon=True)
+               for method in methods]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+
+    errors = []
+    try:
+        while len(errors) < len(workers):
+            if timeout is not None and time.perf_counter() - start > timeout:
+                return None
+            if cancel is not None and cancel.cancelled:
+                return None
+            try:
+                method, moves, expanded, error = results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                # Mọi tiến trình đã chết (ví dụ bị hệ điều hành kill vì hết bộ nhớ) mà không gửi gì
+                if not any(worker.is_alive() for worker in workers) and results.empty():
+                    break
+                continue
+            if error is not None:
+                errors.append(f"{method}: {error}")
+                continue
+            return RaceResult(method, moves, expanded, time.perf_counter() - start)
+    finally:
+        _stop(workers)
+        results.close()
+        results.cancel_join_thread()
+
+    raise RuntimeError("All solvers in the race failed: " + "; ".join(errors or ["no result"]))
+
+
+def _stop(workers):
+    """Dừng các tiến trình còn chạy và thu hồi chúng"""
+    for worker in workers:
+        if worker.is_alive():
+            worker.terminate()
+    for worker in workers:
+        worker.join(timeout=1)
+        if worker.is_alive():
+            worker.kill()
+            worker.join()
@@ -0,0 +1,85 @@
+"""
+Bản ghi gọn các trạng thái đã thăm của một lần tìm kiếm (dùng trong solver_core)
+
+Mỗi trạng thái đã thăm được đánh một id nguyên theo thứ tự được ghi, trạng thái đầu có id 0:
+- ids: khóa trạng thái -> id; khóa là một số nguyên (bitboard hộp << số bit ô | người chơi)
+  nên không còn giữ CompactState nào sau khi nó rời khỏi open list
+- parents: array('I') id của trạng thái cha
+- actions: hành động dẫn tới trạng thái - bytearray hướng đi (0-3) khi tìm theo bước,
+  array('I') mã "ô hộp * 4 + hướng" khi tìm theo lần đẩy; macro move (chuỗi lần đẩy,
+  xem solver_core.macro_push_successors) được lưu trong danh sách macros, mã là
+  MACRO_FLAG | vị trí trong danh sách
+Mỗi trạng thái chỉ tốn một mục dict cộng vài byte trong mảng, thay cho một CompactState
+cộng một tuple (cha, hành động). Dựng lời giải là đi ngược mảng parents: O(độ dài lời giải),
+không tạo đối tượng trạng thái nào.
+
+Vòng lặp tìm kiếm đọc trực tiếp ids / parents / actions (gán vào biến cục bộ) để tránh
+chi phí gọi phương thức cho từng trạng thái con.
+"""
+from array import array
+
+from level_analysis import LETTERS
+
+# Bit đánh dấu mã hành động là chỉ số trong SearchRecord.macros
+MACRO_FLAG = 1 << 31
+
+
+class SearchRecord:
+    """Các trạng thái đã thăm: khóa -> id, cha và hành động theo id"""
+
+    def __init__(self, level, push=False):
+        self.push = push
+        # Số bit cần cho chỉ số ô người chơi trong khóa
+        self.shift = (level.size - 1).bit_length()
+        self.ids = {}
+        self.parents = array("I")
+        self.actions = array("I") if push else bytearray()
+        self.macros = []
+
+    def __len__(self):
+        return len(self.parents)
+
+    def key(self, state):
+        """Khóa nguyên của trạng thái: (bitboard hộp, người chơi) gộp thành một số"""
+        return state.boxes << self.shift | state.player
+
+    def encode(self, action):
+        """Mã số của hành động để lưu vào actions"""
+        if not self.push:
+            return action
+        if type(action[0]) is tuple:
+            # Macro: tuple các lần đẩy
+            self.macros.append(action)
+            return MACRO_FLAG | (len(self.macros) - 1)
+        return action[0] << 2 | action[1]
+
+    def add_root(self, state):
+        """Ghi trạng thái đầu, trả về id 0"""
+        self.ids[self.key(state)] = 0
+        self.parents.append(0)
+        self.actions.append(0)
+        return 0
+
+    def pushes(self, sid):
+        """Danh sách lần đẩy (ô hộp, hướng) từ trạng thái đầu tới trạng thái sid (chế độ push)"""
+        parents, actions = self.parents, self.actions
+        pushes = []
+        while sid:
+            code = actions[sid]
+            if code & MACRO_FLAG:
+                pushes.extend(reversed(self.macros[code ^ MACRO_FLAG]))
+            else:
+                pushes.append((code >> 2, code & 3))
+            sid = parents[sid]
+        pushes.reverse()
+        return pushes
+
+    def moves(self, sid):
+        """Chuỗi hướng đi từ trạng thái đầu tới trạng thái sid (chế độ theo bước)"""
+        parents, actions = self.parents, self.actions
+        letters = []
+        while sid:
+            letters.append(LETTERS[actions[sid]])
+            sid = parents[sid]
+        letters.reverse()
+        return "".join(letters)
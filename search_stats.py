@@ -0,0 +1,237 @@
+"""
+Thống kê và đo đạc của một lần tìm kiếm
+
+Các hàm tìm kiếm (solver_core, ida_star, bidirectional, numpy_bfs, hda_star) nhận
+tham số stats tùy chọn và cập nhật các bộ đếm của nó. Solver tạo một SearchStats
+mới cho mỗi lần giải (Solver.new_stats) theo cấu hình của Solver.instrument.
+
+Chi phí khi tắt gần như bằng 0:
+- Bộ đếm là phép cộng số nguyên trên thuộc tính, rẻ hơn nhiều so với sinh trạng thái con
+- Bộ đo thời gian chỉ được cài khi timing=True: hàm được bọc bằng timed(), khi tắt
+  timed() trả về nguyên hàm gốc nên vòng lặp tìm kiếm không có thêm lời gọi nào
+- Callback dùng ngưỡng report_at; không có callback thì ngưỡng là vô cùng
+
+Ngân sách (Budget): giới hạn thời gian / số nút / bộ nhớ và cờ hủy (CancelToken),
+được kiểm tra trong report() sau mỗi check_interval nút mở rộng, dùng chung ngưỡng
+report_at với callback. Vượt ngân sách thì report() ném BudgetExceeded; các hàm tìm
+kiếm đã cộng dồn bộ đếm trong khối finally nên stats giữ thống kê dở dang.
+"""
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows không có module resource
+    resource = None
+
+try:
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # Không có sysconf (Windows)
+    PAGE_SIZE = 4096
+
+# Mặc định gọi callback sau mỗi 10000 nút mở rộng
+DEFAULT_INTERVAL = 10000
+# Mặc định kiểm tra ngân sách sau mỗi 1000 nút mở rộng
+DEFAULT_CHECK_INTERVAL = 1000
+
+
+class CancelToken:
+    """Cờ hủy dùng chung giữa các thread: thread giao diện gọi cancel(), tìm kiếm đọc cancelled"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+
+class BudgetExceeded(Exception):
+    """Tìm kiếm bị dừng vì vượt ngân sách hoặc bị hủy; reason là lý do, stats là thống kê dở dang"""
+
+    def __init__(self, reason, stats):
+        super().__init__(reason)
+        self.reason = reason
+        self.stats = stats
+
+
+class Budget:
+    """
+    Giới hạn tài nguyên của một lần tìm kiếm, None = không giới hạn
+    time_limit: giây; node_limit: số nút mở rộng; memory_limit_kb: RSS hiện tại (KB)
+    cancel: CancelToken; check_interval: số nút mở rộng giữa hai lần kiểm tra
+    """
+
+    def __init__(self, time_limit=None, node_limit=None, memory_limit_kb=None, cancel=None,
+                 check_interval=DEFAULT_CHECK_INTERVAL):
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.memory_limit_kb = memory_limit_kb
+        self.cancel = cancel
+        self.check_interval = check_interval
+
+    def check(self, stats):
+        """Lý do dừng nếu stats đã vượt ngân sách, ngược lại None"""
+        if self.cancel is not None and self.cancel.cancelled:
+            return "cancelled"
+        if self.node_limit is not None and stats.expanded >= self.node_limit:
+            return f"node limit ({self.node_limit} nodes)"
+        if self.time_limit is not None and stats.elapsed() >= self.time_limit:
+            return f"time limit ({self.time_limit}s)"
+        if self.memory_limit_kb is not None:
+            rss = current_rss_kb()
+            if rss is not None and rss >= self.memory_limit_kb:
+                return f"memory limit ({self.memory_limit_kb} KB)"
+        return None
+
+    def next_check(self, expanded):
+        """Số nút mở rộng ở lần kiểm tra kế tiếp, không vượt quá node_limit"""
+        at = expanded + self.check_interval
+        if self.node_limit is not None:
+            at = min(at, max(self.node_limit, expanded + 1))
+        return at
+
+
+class SearchStats:
+    """Bộ đếm, bộ đo thời gian và callback tiến độ của một lần tìm kiếm"""
+
+    def __init__(self, timing=False, callback=None, interval=DEFAULT_INTERVAL, budget=None):
+        # Số trạng thái đã được lấy ra và sinh con
+        self.expanded = 0
+        # Số trạng thái con được sinh ra
+        self.generated = 0
+        # Số trạng thái con đã gặp trước đó (bị bỏ qua)
+        self.duplicates = 0
+        # Số lần đưa vào / lấy ra khỏi open list (hàng đợi, heap)
+        self.pushes = 0
+        self.pops = 0
+        # Kích thước frontier và f tốt nhất ở lần báo cáo gần nhất
+        self.frontier = 0
+        self.best_f = None
+        # Tên công đoạn -> tổng thời gian (giây), chỉ có khi timing=True
+        self.timing = timing
+        self.timers = {}
+        self.callback = callback
+        self.interval = interval
+        self.budget = budget
+        # Lý do dừng sớm (BudgetExceeded.reason), None nếu tìm kiếm chạy tới cùng
+        self.exceeded = None
+        # Số nút mở rộng ở lần gọi callback / kiểm tra ngân sách kế tiếp;
+        # vòng lặp tìm kiếm chỉ so sánh expanded với report_at = ngưỡng nhỏ hơn
+        # (vô cùng nếu không có callback lẫn ngân sách)
+        self.callback_at = interval if callback is not None else float("inf")
+        self.check_at = budget.next_check(0) if budget is not None else float("inf")
+        self.report_at = min(self.callback_at, self.check_at)
+        self.started = time.perf_counter()
+        self.stopped = None
+
+    def timed(self, name, func):
+        """Bọc func để cộng thời gian chạy vào timers[name]; trả về func nguyên vẹn khi timing tắt"""
+        if not self.timing:
+            return func
+        timers = self.timers
+        timers.setdefault(name, 0.0)
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timers[name] += clock() - start
+        return wrapper
+
+    def report(self, frontier, best_f=None):
+        """
+        Ghi lại frontier / f tốt nhất, kiểm tra ngân sách, gọi callback và dời ngưỡng kế tiếp
+        Ném BudgetExceeded khi vượt ngân sách hoặc bị hủy
+        """
+        self.frontier = frontier
+        self.best_f = best_f
+        if self.expanded >= self.check_at:
+            reason = self.budget.check(self)
+            if reason is not None:
+                self.exceeded = reason
+                self.stop()
+                raise BudgetExceeded(reason, self)
+            self.check_at = self.budget.next_check(self.expanded)
+        if self.expanded >= self.callback_at:
+            self.callback_at = self.expanded + self.interval
+            self.callback(self)
+        self.report_at = min(self.callback_at, self.check_at)
+
+    def stop(self):
+        """Đánh dấu tìm kiếm đã kết thúc, elapsed() không tăng nữa"""
+        if self.stopped is None:
+            self.stopped = time.perf_counter()
+
+    def elapsed(self):
+        """Số giây kể từ khi bắt đầu tìm kiếm (tới lúc stop() nếu đã dừng)"""
+        end = self.stopped if self.stopped is not None else time.perf_counter()
+        return end - self.started
+
+    def rate(self):
+        """Số nút mở rộng mỗi giây"""
+        elapsed = self.elapsed()
+        return self.expanded / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self):
+        """Ảnh chụp tiến độ (dict bất biến, an toàn để gửi sang thread khác)"""
+        return {
+            "expanded": self.expanded,
+            "frontier": self.frontier,
+            "best_f": self.best_f,
+            "rate": self.rate(),
+            "elapsed": self.elapsed(),
+        }
+
+    def as_dict(self):
+        """Dạng dict để ghi JSON"""
+        data = {
+            "expanded": self.expanded,
+            "generated": self.generated,
+            "duplicates": self.duplicates,
+            "pushes": self.pushes,
+            "pops": self.pops,
+        }
+        if self.exceeded is not None:
+            data["exceeded"] = self.exceeded
+        if self.timers:
+            data["timers"] = {name: round(seconds, 6) for name, seconds in self.timers.items()}
+        return data
+
+    def format_report(self):
+        """Báo cáo nhiều dòng: bộ đếm và thời gian của từng công đoạn"""
+        lines = [
+            f"Expanded: {self.expanded}  Generated: {self.generated}  Duplicates: {self.duplicates}",
+            f"Open list pushes: {self.pushes}  pops: {self.pops}",
+        ]
+        total = self.elapsed()
+        for name, seconds in sorted(self.timers.items(), key=lambda item: -item[1]):
+            share = 100 * seconds / total if total > 0 else 0.0
+            lines.append(f"  {name:<12} {seconds:9.4f}s ({share:5.1f}%)")
+        return "\n".join(lines)
+
+
+def current_rss_kb():
+    """RSS hiện tại của tiến trình (KB), đọc /proc trên Linux; nơi khác dùng RSS đỉnh"""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return peak_rss_kb()
+    return pages * PAGE_SIZE // 1024
+
+
+def peak_rss_kb():
+    """RSS đỉnh của tiến trình hiện tại (KB); None nếu hệ điều hành không hỗ trợ"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về KB, macOS trả về byte
+    return peak // 1024 if sys.platform == "darwin" else peak
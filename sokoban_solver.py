@@ -1,10 +1,22 @@
 import time
 import os
-import heapq
+import queue
 import threading
 import tkinter as tk
 from tkinter import messagebox
-import tracemalloc  # Thêm thư viện đo bộ nhớ
+
+import bidirectional
+import cost_models
+import hda_star
+import ida_star
+import numpy_bfs
+import portfolio
+import solution_cache
+import solver_core
+import symmetry
+from heuristics import HEURISTICS
+from level_analysis import Level
+from search_stats import DEFAULT_INTERVAL, Budget, BudgetExceeded, CancelToken, SearchStats, peak_rss_kb
 
 # ----------------------- Original game logic (kept, not rewritten) -----------------------
 
@@ -15,6 +27,8 @@ class GameState:
     """
     Lớp đại diện cho trạng thái của game tại một thời điểm
     Mỗi trạng thái bao gồm: vị trí người chơi, vị trí các hộp, chi phí và heuristic
+    Trạng thái con được sinh trên dạng gọn trong solver_core (move_successors,
+    push_successors), đã loại các lần đẩy hộp vào ô chết (Level.dead)
     """
     def __init__(self, player, boxes, cost=0, heuristic=0):
         self.player = player  # (x, y) = (col, row) - vị trí người chơi
@@ -34,41 +48,6 @@ class GameState:
         """So sánh nhỏ hơn: dùng cho priority queue trong A*"""
         return (self.cost + self.heuristic) < (other.cost + other.heuristic)
 
-    def generate_state(self):
-        """
-        Sinh ra các trạng thái con có thể đạt được từ trạng thái hiện tại
-        Trả về danh sách các GameState mới
-        """
-        # Các hướng di chuyển: Lên, Xuống, Trái, Phải (dx, dy)
-        moves = [(0, -1), (0, +1), (-1, 0), (+1, 0)]
-
-        child_state = []  # Danh sách trạng thái con
-
-        for dx, dy in moves:
-            px, py = self.player
-            new_player = (px + dx, py + dy)  # Vị trí người chơi mới
-
-            # Kiểm tra nếu vị trí mới là tường
-            if game_map[new_player[1]][new_player[0]] == "#":
-                continue  # Không thể di chuyển vào tường
-
-            # Trường hợp 1: Di chuyển vào ô trống
-            if new_player not in self.boxes:
-                child_state.append(GameState(new_player, self.boxes, self.cost + 1))
-
-            # Trường hợp 2: Đẩy hộp
-            else:
-                new_box = (new_player[0] + dx, new_player[1] + dy)  # Vị trí hộp mới sau khi đẩy
-
-                # Kiểm tra có thể đẩy hộp: không phải tường và không có hộp khác
-                if game_map[new_box[1]][new_box[0]] != "#" and new_box not in self.boxes:
-                    new_box_state = set(self.boxes)
-                    new_box_state.remove(new_player)  # Xóa hộp ở vị trí cũ
-                    new_box_state.add(new_box)  # Thêm hộp ở vị trí mới
-                    child_state.append(GameState(new_player, frozenset(new_box_state), self.cost + 1))
-
-        return child_state
-
 
 class Solver:
     """
@@ -76,132 +55,231 @@ class Solver:
     Implement BFS và A* search
     """
     
-    def bfs(self, start_state, goal):
+    def __init__(self):
+        self.level = None  # Thông tin tĩnh của level (bản đồ làm phẳng, bảng Zobrist)
+        self.stats = None  # Thống kê của lần giải gần nhất (search_stats.SearchStats)
+        self.stats_options = {}  # Cấu hình đo đạc, xem instrument()
+        self.race_result = None  # Kết quả của lần chạy đua gần nhất (portfolio.RaceResult)
+        self.anytime_solutions = []  # Các lời giải tốt dần của anytime A*: (chi phí, weight, số nút, giây)
+        self.moves = None  # Chuỗi di chuyển của lần giải gần nhất (None nếu không có lời giải)
+        self.cache = None  # Bộ nhớ đệm lời giải trên đĩa (solution_cache.SolutionCache), None = không dùng
+        self.cache_hit = False
+        self.budget = None  # Ngân sách cho mỗi lần giải (search_stats.Budget), None = không giới hạn
+        self.exceeded = None  # Lý do lần giải gần nhất bị dừng sớm, None nếu chạy hết
+
+    def get_level(self, goal):
+        """Lấy Level cho bản đồ hiện tại, chỉ phân tích lại khi đổi bản đồ hoặc goal"""
+        if self.level is None or self.level.base_map is not game_map or self.level.goals != goal:
+            self.level = Level(game_map, goal)
+        return self.level
+
+    def instrument(self, timing=False, callback=None, interval=DEFAULT_INTERVAL):
+        """
+        Cấu hình đo đạc cho các lần giải sau (xem search_stats.py)
+        timing: đo thời gian sinh trạng thái con, heuristic, heap, dựng lời giải
+        callback(stats): được gọi sau mỗi interval nút mở rộng
+        Mặc định tắt hết, chỉ còn các bộ đếm gần như không tốn chi phí
+        """
+        self.stats_options = {"timing": timing, "callback": callback, "interval": interval}
+
+    def new_stats(self):
+        """Tạo bộ đếm cho lần giải mới, giữ ở self.stats để đọc sau khi giải xong"""
+        self.stats = SearchStats(budget=self.budget, **self.stats_options)
+        return self.stats
+
+    def search(self, start_state, run):
+        """
+        Gọi run(stats) với bộ đếm mới (theo ngân sách self.budget)
+        Trả về chuỗi di chuyển (U, D, L, R) hoặc None nếu không có lời giải;
+        danh sách GameState chỉ được dựng khi cần (moves_to_path)
+        Vượt ngân sách hoặc bị hủy: trả về None, lý do ghi ở self.exceeded,
+        self.stats giữ thống kê dở dang
+        """
+        self.exceeded = None
+        stats = self.new_stats()
+        try:
+            moves = run(stats)
+        except BudgetExceeded as exc:
+            self.exceeded = exc.reason
+            moves = None
+        return self.finish(moves)
+
+    def bfs(self, start_state, goal, push=False, macros=False):
         """
         Giải thuật BFS (Breadth-First Search)
         Tìm đường đi ngắn nhất theo số bước di chuyển
+        push=True: tìm theo từng lần đẩy hộp (ít lần đẩy nhất)
+        macros=True (cần push=True): gộp đẩy qua đường hầm / vào phòng goal thành macro move,
+        mở rộng ít nút hơn nhưng không còn đảm bảo ít lần đẩy nhất
+        Tìm kiếm chạy trên trạng thái gọn (solver_core.CompactState)
+        """
+        level = self.get_level(goal)
+        return self.search(start_state, lambda stats: solver_core.bfs(
+            level, start_state.player, start_state.boxes, push, stats, macros))
+
+    def dfs(self, start_state, goal):
         """
-        q = [start_state]  # Hàng đợi cho BFS
-        parents = {start_state: None}  # Dictionary lưu vết đường đi
-
-        while q:
-            state = q.pop(0)  # Lấy trạng thái đầu hàng đợi
-
-            # Kiểm tra điều kiện chiến thắng: tất cả hộp đều ở goal
-            if state.boxes == goal:
-                # Truy vết đường đi từ goal về start
-                path = []
-                curr = state
-                while curr is not None:
-                    path.append(curr)
-                    curr = parents[curr]
-                path.reverse()  # Đảo ngược để có đường đi từ start đến goal
-                return path
-
-            # Duyệt qua các trạng thái con
-            for child in state.generate_state():
-                if child not in parents:
-                    parents[child] = state  # Lưu parent
-                    q.append(child)  # Thêm vào hàng đợi
-
-        return []  # Không tìm thấy đường đi
-
-    def dfs(self):
-        """Giải thuật DFS (chưa implement)"""
-        pass
-
-    def a_star(self, start_state, goal):
+        Thay cho DFS: IDA* (ida_star.py) theo số lần đẩy
+        Bộ nhớ tỉ lệ với độ sâu lời giải cộng một bảng chuyển vị kích thước cố định,
+        giải được level khó mà BFS / A* hết bộ nhớ; lời giải ít lần đẩy nhất
+        """
+        level = self.get_level(goal)
+        return self.search(start_state, lambda stats: ida_star.ida_star(
+            level, start_state.player, start_state.boxes, stats=stats))
+
+    def a_star(self, start_state, goal, push=False, heuristic="manhattan", macros=False):
         """
         Giải thuật A* search
         Kết hợp chi phí thực tế (cost) và heuristic để tìm đường đi tối ưu
+        push=True: tìm theo từng lần đẩy hộp, g(n) = số lần đẩy
+        heuristic: "manhattan" (gốc, không đảm bảo tối ưu) hoặc
+        "matching" (ghép cặp box - goal tối thiểu, admissible -> lời giải tối ưu)
+        macros=True (cần push=True): dùng macro move như bfs(), g vẫn đếm từng lần đẩy
+        Tìm kiếm chạy trên trạng thái gọn (solver_core.CompactState)
         """
-        open_set = []  # Priority queue cho các trạng thái cần xét
-        heapq.heappush(open_set, (0, start_state))  # Đẩy trạng thái đầu với f_score = 0
-        
-        g_score = {start_state: 0}  # Chi phí thực tế từ start đến mỗi trạng thái
-        parents = {start_state: None}  # Dictionary lưu vết đường đi
-        
-        goal_positions = set(goal)  # Tập hợp các vị trí goal
-
-        while open_set:
-            _, current = heapq.heappop(open_set)  # Lấy trạng thái có f_score nhỏ nhất
-
-            # Kiểm tra điều kiện chiến thắng
-            if current.boxes == goal:
-                # Truy vết đường đi
-                path = []
-                curr = current
-                while curr is not None:
-                    path.append(curr)
-                    curr = parents[curr]
-                path.reverse()
-                return path
-
-            # Duyệt qua các trạng thái con
-            for child in current.generate_state():
-                # Tính heuristic cho trạng thái con
-                child.heuristic = self.heuristic_func(child.boxes, goal_positions, child.player)
-                
-                # Chi phí thực tế từ start đến child (qua current)
-                tentative_g_score = g_score[current] + 1
-                
-                # Nếu tìm được đường đi tốt hơn đến child
-                if child not in g_score or tentative_g_score < g_score[child]:
-                    g_score[child] = tentative_g_score
-                    child.cost = tentative_g_score
-                    parents[child] = current
-                    # f_score = g_score + heuristic
-                    f_score = tentative_g_score + child.heuristic
-                    heapq.heappush(open_set, (f_score, child))
-
-        return []  # Không tìm thấy đường đi
-
-    def heuristic_func(self, boxes, goals, player):
+        level = self.get_level(goal)
+        return self.search(start_state, lambda stats: solver_core.a_star(
+            level, start_state.player, start_state.boxes, push, HEURISTICS[heuristic], stats, macros))
+
+    def anytime_a_star(self, start_state, goal, push=True, heuristic="matching", on_solution=None):
         """
-        Hàm heuristic cho A*
-        Kết hợp nhiều yếu tố để ước lượng chi phí còn lại:
-        1. Tổng khoảng cách Manhattan từ các box đến goal gần nhất
-        2. Penalty cho các box ở vị trí deadlock
-        3. Khoảng cách từ player đến box gần nhất
+        Anytime A* (solver_core.anytime_a_star): chạy lại weighted A* với weight giảm dần
+        on_solution(moves, chi phí, weight) được gọi cho mỗi lời giải tốt hơn (trên thread solver)
+        Trả về lời giải tốt nhất; self.exceeded là None nghĩa là đã chứng minh tối ưu
+        (heuristic "matching"), ngược lại là lời giải tốt nhất có được trước khi dừng
         """
-        total_distance = 0
-        box_list = list(boxes)
-        goal_list = list(goals)
-        
-        # 1. Tính tổng khoảng cách Manhattan từ mỗi box đến goal gần nhất
-        for box in box_list:
-            min_dist = float('inf')
-            for goal_pos in goal_list:
-                dist = abs(box[0] - goal_pos[0]) + abs(box[1] - goal_pos[1])
-                min_dist = min(min_dist, dist)
-            total_distance += min_dist
-        
-        # 2. Thêm penalty cho deadlock đơn giản
-        deadlock_penalty = 0
-        for box in box_list:
-            if box not in goals:
-                # Kiểm tra deadlock cơ bản: box trong góc
-                x, y = box
-                if self.is_corner_deadlock(x, y):
-                    deadlock_penalty += 100  # Penalty lớn cho vị trí deadlock
-        
-        # 3. Khoảng cách từ player đến box gần nhất (để ưu tiên states mà player gần boxes)
-        min_player_to_box = float('inf')
-        for box in box_list:
-            dist = abs(player[0] - box[0]) + abs(player[1] - box[1])
-            min_player_to_box = min(min_player_to_box, dist)
-        
-        return total_distance + deadlock_penalty + min_player_to_box * 0.1
+        level = self.get_level(goal)
+        self.anytime_solutions = []
+
+        def run(stats):
+            moves = None
+            start_time = time.perf_counter()
+            solutions = solver_core.anytime_a_star(
+                level, start_state.player, start_state.boxes, push, HEURISTICS[heuristic], stats)
+            try:
+                for moves, cost, weight in solutions:
+                    self.anytime_solutions.append((cost, weight, stats.expanded, time.perf_counter() - start_time))
+                    if on_solution is not None:
+                        on_solution(moves, cost, weight)
+            except BudgetExceeded as exc:
+                # Vẫn trả về lời giải tốt nhất đã có
+                self.exceeded = exc.reason
+            return moves
+
+        return self.search(start_state, run)
+
+    def optimal(self, start_state, goal, model="pushes-moves", heuristic="matching"):
+        """
+        Giải tối ưu theo mô hình chi phí model trong cost_models.COST_MODELS
+        ("moves", "pushes", "pushes-moves", "moves-pushes"; hai mô hình sau so sánh theo thứ tự từ điển)
+        """
+        level = self.get_level(goal)
+        return self.search(start_state, lambda stats: cost_models.optimal_search(
+            level, start_state.player, start_state.boxes, model, HEURISTICS[heuristic], stats))
+
+    def bfs_vectorized(self, start_state, goal):
+        """
+        BFS theo từng lớp vector hóa bằng NumPy (numpy_bfs.py)
+        Cùng kết quả với bfs() theo từng bước nhưng mở rộng cả frontier một lần
+        """
+        level = self.get_level(goal)
+        return self.search(start_state, lambda stats: numpy_bfs.bfs(
+            level, start_state.player, start_state.boxes, stats))
+
+    def bidirectional(self, start_state, goal):
+        """
+        Tìm kiếm hai chiều (bidirectional.py): đẩy xuôi từ trạng thái đầu,
+        kéo ngược từ trạng thái đã giải, dừng khi hai frontier gặp nhau
+        Lời giải ít lần đẩy nhất, độ sâu mỗi chiều chỉ khoảng một nửa
+        """
+        level = self.get_level(goal)
+        return self.search(start_state, lambda stats: bidirectional.bidirectional(
+            level, start_state.player, start_state.boxes, stats))
+
+    def hda_star(self, start_state, goal, workers=None):
+        """
+        A* song song (hda_star.py): trạng thái được chia cho các tiến trình worker
+        theo khóa băm, mỗi worker có open list / bảng g riêng
+        Heuristic ghép cặp tối thiểu nên lời giải ít lần đẩy nhất
+        """
+        level = self.get_level(goal)
+        return self.search(start_state, lambda stats: hda_star.hda_star(
+            level, start_state.player, start_state.boxes, workers, stats))
 
-    def is_corner_deadlock(self, x, y):
-        """Kiểm tra xem box có bị kẹt trong góc không"""
-        # Kiểm tra nếu ở góc map (hai hướng di chuyển bị chặn bởi tường)
-        if (game_map[y-1][x] == '#' and game_map[y][x-1] == '#') or \
-           (game_map[y-1][x] == '#' and game_map[y][x+1] == '#') or \
-           (game_map[y+1][x] == '#' and game_map[y][x-1] == '#') or \
-           (game_map[y+1][x] == '#' and game_map[y][x+1] == '#'):
-            return True
-        return False
+    def race(self, start_state, goal, timeout=None):
+        """
+        Chạy đua nhiều cấu hình solver trong các tiến trình riêng (portfolio.py),
+        lấy lời giải về trước và dừng các tiến trình còn lại
+        Kết quả (cấu hình thắng, nhãn tối ưu) giữ ở self.race_result
+        Ngân sách: chỉ giới hạn thời gian và cờ hủy được áp dụng (các tiến trình con
+        không chia sẻ bộ đếm nút / bộ nhớ với tiến trình này)
+        """
+        level = self.get_level(goal)
+        self.exceeded = None
+        cancel = None
+        if self.budget is not None:
+            cancel = self.budget.cancel
+            if self.budget.time_limit is not None:
+                timeout = min(timeout or self.budget.time_limit, self.budget.time_limit)
+        result = portfolio.race(level.base_map, goal, start_state.player, start_state.boxes,
+                                timeout=timeout, cancel=cancel)
+        self.race_result = result
+        self.stats = SearchStats()
+        if result is None:
+            # race chỉ trả None khi bị hủy hoặc hết giờ; không có giới hạn nào thì là không có lời giải
+            if cancel is not None and cancel.cancelled:
+                self.exceeded = "cancelled"
+            elif timeout is not None:
+                self.exceeded = f"time limit ({timeout}s)"
+            self.stats.exceeded = self.exceeded
+            return self.finish(None)
+        self.stats.expanded = result.expanded
+        return self.finish(result.moves)
+
+    def solve_cached(self, method, start_state, goal, solve):
+        """
+        Tra bộ nhớ đệm lời giải (self.cache) trước khi gọi solve()
+        method: tên phương pháp, là một phần của khóa cache
+        solve: hàm không tham số gọi một phương thức giải của Solver, trả về chuỗi di chuyển
+        Khóa lấy theo hướng chuẩn của level (symmetry.py): các level là ảnh quay / lật
+        của nhau dùng chung một mục, lời giải được đổi về hướng của level hiện tại
+        """
+        self.cache_hit = False
+        self.exceeded = None
+        if self.cache is None:
+            return solve()
+        level = self.get_level(goal)
+        transform, canonical = symmetry.canonicalize(level.base_map, goal, start_state.player, start_state.boxes)
+        key = solution_cache.make_key(*canonical, method)
+        entry = self.cache.get(key)
+        if entry is not None:
+            moves, stats = entry
+            self.cache_hit = True
+            self.stats = SearchStats()
+            self.stats.expanded = stats["expanded"]
+            return self.finish(symmetry.moves_from_canonical(moves, transform))
+        moves = solve()
+        if self.exceeded is not None:
+            return moves  # Dừng vì ngân sách không phải là kết luận "không có lời giải", không lưu
+        self.cache.put(key, symmetry.moves_to_canonical(moves, transform), self.stats.as_dict())
+        return moves
+
+    def finish(self, moves):
+        """Kết thúc một lần giải: dừng đồng hồ của stats, giữ chuỗi di chuyển ở self.moves"""
+        if self.stats is not None:
+            self.stats.stop()
+        self.moves = moves
+        return moves
+
+    def moves_to_path(self, start_state, moves):
+        """
+        Dựng danh sách GameState từ chuỗi di chuyển, chỉ khi cần (ví dụ để animate)
+        Trả về [] nếu moves là None
+        """
+        if moves is None:
+            return []
+        steps = solver_core.replay_moves(start_state.player, start_state.boxes, moves)
+        return [GameState(player, boxes, cost) for cost, (player, boxes) in enumerate(steps)]
 
 
 class Utils:
@@ -213,33 +291,12 @@ class Utils:
             print("".join(r))
         print()
 
-    def print_path(self, init_player_pos, path):
-        """Chuyển đổi đường đi thành chuỗi hướng di chuyển (U, D, L, R)"""
-        if not path:
+    def print_path(self, moves):
+        """In chuỗi hướng di chuyển (U, D, L, R) mà solver trả về"""
+        if moves is None:
             print("No solution path to print.")
             return
-
-        curr_pos = init_player_pos
-        path_str = ""
-
-        for state in path[1:]:
-            next_pos = state.player
-            dx = next_pos[0] - curr_pos[0]
-            dy = next_pos[1] - curr_pos[1]
-
-            # Xác định hướng di chuyển dựa trên vector (dx, dy)
-            if (dx, dy) == (1, 0):
-                path_str += "R"  # Right
-            elif (dx, dy) == (-1, 0):
-                path_str += "L"  # Left
-            elif (dx, dy) == (0, 1):
-                path_str += "D"  # Down
-            elif (dx, dy) == (0, -1):
-                path_str += "U"  # Up
-
-            curr_pos = next_pos
-
-        print(f"Path: {path_str}\n")
+        print(f"Path: {moves}\n")
 
     def clear_screen(self):
         """Xóa màn hình console"""
@@ -278,6 +335,11 @@ class Utils:
 # ----------------------- UI / Glue code -----------------------
 
 CELL_SIZE = 40  # pixels per tile in canvas
+SOLVER_MEMORY_LIMIT_KB = 2 * 1024 * 1024  # trần RSS khi giải tự động (2 GB), tránh làm treo máy
+PROGRESS_INTERVAL = 2000  # số nút mở rộng giữa hai ảnh chụp tiến độ
+PROGRESS_POLL_MS = 100  # chu kỳ UI đọc hàng đợi tiến độ
+ANIMATION_DELAY_MS = 120  # thời gian giữa hai bước khi animate lời giải
+MOVE_DELTAS = {letter: (dx, dy) for dx, dy, letter in solver_core.MOVES}  # 'U' -> (0, -1)...
 COLORS = {
     '#': '#777777',  # wall: gray
     ' ': '#ffffff',  # empty: white
@@ -309,12 +371,28 @@ class SokobanUI:
         # Khởi tạo các thành phần
         self.state = GameState(self.player, self.boxes)
         self.solver = Solver()
+        self.solver.cache = solution_cache.SolutionCache()
+        # Cờ hủy của lần giải đang chạy (None khi không giải)
+        self.cancel_token = None
+        # Đang giải / animate lời giải: không nhận lần tự giải mới
+        self.busy = False
+        # Kênh tiến độ: thread solver gửi ('progress', snapshot), ('solution', ...) của anytime A*
+        # và ('done', ...), UI thread đọc
+        self.progress = queue.Queue()
+        # Lời giải tốt nhất hiện có của anytime A* để hiện trên dòng tiến độ
+        self.best_text = ''
         self.utils = Utils()
+        # Phân tích tĩnh level (ô chết, bảng Zobrist...) một lần khi load
+        self.solver.get_level(self.goals)
 
         # Thông tin UI
         self.rows = len(self.base_map)
         self.cols = max(len(r) for r in self.base_map)
 
+        # Item động trên canvas, tạo ở lần vẽ đầu tiên (draw_static)
+        self.box_items = None
+        self.player_item = None
+
         # Xây dựng giao diện
         self.build_ui()
 
@@ -326,6 +404,8 @@ class SokobanUI:
         self.root.bind('<Down>', lambda e: self.move(0, 1))
         self.root.bind('<Left>', lambda e: self.move(-1, 0))
         self.root.bind('<Right>', lambda e: self.move(1, 0))
+        # Esc: hủy lần giải tự động đang chạy
+        self.root.bind('<Escape>', lambda e: self.cancel_solve())
         
     def create_default_level(self):
         """Tạo testcase mặc định nếu file level không tồn tại"""
@@ -420,6 +500,12 @@ class SokobanUI:
                         map_row.append(char)  # Giữ nguyên tường, ô trống
                 base_map.append(map_row)
 
+        if not any(base_map):
+            # Level rỗng (Level báo ValueError), xử lý như khi không có file
+            print(f"Level file '{self.level_file}' is empty. Using default level...")
+            self.create_default_level()
+            return
+
         # Cập nhật các biến
         self.base_map = base_map
         game_map = base_map  # Cập nhật biến toàn cục
@@ -449,6 +535,9 @@ class SokobanUI:
         btn_down = tk.Button(self.root, text='Down', width=8, command=lambda: self.move(0, 1))
         btn_down.grid(row=3, column=1, pady=6)
 
+        # Các nút bị tắt khi đang giải / animate (disable_controls)
+        self.control_buttons = (btn_up, btn_left, btn_reset, btn_right, btn_down)
+
         # Các nút giải tự động
         btn_solve_bfs = tk.Button(self.root, text='Auto Solve (BFS)', width=15, command=lambda: self.start_auto_solve('bfs'))
         btn_solve_bfs.grid(row=1, column=3, padx=10)
@@ -456,9 +545,48 @@ class SokobanUI:
         btn_solve_astar = tk.Button(self.root, text='Auto Solve (A*)', width=15, command=lambda: self.start_auto_solve('astar'))
         btn_solve_astar.grid(row=2, column=3)
 
+        btn_solve_bidir = tk.Button(self.root, text='Auto Solve (Bidir)', width=15, command=lambda: self.start_auto_solve('bidir'))
+        btn_solve_bidir.grid(row=2, column=4, padx=10)
+
+        btn_solve_ida = tk.Button(self.root, text='Auto Solve (IDA*)', width=15, command=lambda: self.start_auto_solve('idastar'))
+        btn_solve_ida.grid(row=3, column=4, padx=10)
+
+        # Chạy đua nhiều solver song song, lấy lời giải về trước
+        btn_solve_race = tk.Button(self.root, text='Auto Solve (Race)', width=15, command=lambda: self.start_auto_solve('race'))
+        btn_solve_race.grid(row=4, column=4, padx=10)
+
+        # Anytime A*: có lời giải ngay, sau đó tìm lời giải ngắn hơn tới khi chứng minh tối ưu
+        # (Cancel để dừng và dùng lời giải tốt nhất hiện có)
+        btn_solve_anytime = tk.Button(self.root, text='Anytime A*', width=15, command=lambda: self.start_auto_solve('anytime'))
+        btn_solve_anytime.grid(row=2, column=5, padx=10)
+
+        # Tùy chọn tìm theo từng lần đẩy hộp (nhanh hơn nhiều trên level lớn)
+        self.push_var = tk.BooleanVar(value=False)
+        chk_push = tk.Checkbutton(self.root, text='Push-level search', variable=self.push_var)
+        chk_push.grid(row=3, column=3)
+
+        # Heuristic ghép cặp tối thiểu cho A* (admissible -> lời giải tối ưu)
+        self.matching_var = tk.BooleanVar(value=False)
+        chk_matching = tk.Checkbutton(self.root, text='Matching heuristic (A*)', variable=self.matching_var)
+        chk_matching.grid(row=4, column=3)
+
+        # Macro move qua đường hầm / vào phòng goal (chỉ dùng khi tìm theo lần đẩy)
+        self.macro_var = tk.BooleanVar(value=False)
+        chk_macro = tk.Checkbutton(self.root, text='Macro moves (push)', variable=self.macro_var)
+        chk_macro.grid(row=3, column=5)
+
+        # Dừng lần tự giải đang chạy (cũng có thể bấm Esc)
+        self.btn_cancel = tk.Button(self.root, text='Cancel', width=8, command=self.cancel_solve, state='disabled')
+        self.btn_cancel.grid(row=4, column=1, pady=6)
+
+        # Tiến độ của solver: số nút, frontier, f tốt nhất, tốc độ
+        self.progress_var = tk.StringVar()
+        self.progress_label = tk.Label(self.root, textvariable=self.progress_var, font=('Arial', 9), anchor='w')
+        self.progress_label.grid(row=5, column=0, columnspan=6, padx=6, pady=(0, 6), sticky='we')
+
         # Label hiển thị thông tin
         self.info_var = tk.StringVar()
-        self.info_var.set('Moves: 0 | Memory: 0.0KB')
+        self.info_var.set('Moves: 0')
         self.info_label = tk.Label(self.root, textvariable=self.info_var, font=('Arial', 10))
         self.info_label.grid(row=1, column=4, columnspan=2, padx=10, sticky='w')
 
@@ -469,15 +597,25 @@ class SokobanUI:
         self.move_count = 0
 
     def draw_map(self):
-        """Vẽ toàn bộ bản đồ lên canvas"""
+        """
+        Vẽ bản đồ lên canvas
+        Lần đầu dựng toàn bộ (draw_static); các lần sau chỉ dời item của hộp và người chơi
+        bằng canvas.coords, không tạo lại các ô tĩnh
+        """
+        if self.box_items is None:
+            self.draw_static()
+        self.update_dynamic()
+
+        # Cập nhật thông tin
+        self.info_var.set(f'Moves: {self.move_count}')
+
+    def draw_static(self):
+        """Tạo một lần các item không đổi (tường, nền, goal) và item người chơi"""
         self.canvas.delete('all')  # Xóa canvas cũ
 
         for r in range(self.rows):
             for c in range(self.cols):
-                x1 = c * CELL_SIZE
-                y1 = r * CELL_SIZE
-                x2 = x1 + CELL_SIZE
-                y2 = y1 + CELL_SIZE
+                x1, y1, x2, y2 = self.cell_bounds(c, r, 0)
 
                 # Lấy ký tự tại vị trí (c, r)
                 ch = ' '
@@ -492,28 +630,45 @@ class SokobanUI:
 
                 # Vẽ goal (nếu có)
                 if (c, r) in self.goals:
-                    self.canvas.create_oval(x1+8, y1+8, x2-8, y2-8, fill=COLORS['goal'], outline='')
-
-                # Vẽ hộp
-                if (c, r) in self.state.boxes:
-                    if (c, r) in self.goals:
-                        # Hộp trên goal
-                        self.canvas.create_rectangle(x1+6, y1+6, x2-6, y2-6, fill=COLORS['box_on_goal'], outline='black')
-                    else:
-                        # Hộp thường
-                        self.canvas.create_rectangle(x1+6, y1+6, x2-6, y2-6, fill=COLORS['box'], outline='black')
-
-                # Vẽ người chơi
-                if (c, r) == self.state.player:
-                    if (c, r) in self.goals:
-                        # Người chơi trên goal
-                        self.canvas.create_oval(x1+10, y1+10, x2-10, y2-10, fill=COLORS['player_on_goal'], outline='black')
-                    else:
-                        # Người chơi thường
-                        self.canvas.create_oval(x1+10, y1+10, x2-10, y2-10, fill=COLORS['player'], outline='black')
-
-        # Cập nhật thông tin
-        self.info_var.set(f'Moves: {self.move_count}')
+                    self.canvas.create_oval(*self.cell_bounds(c, r, 8), fill=COLORS['goal'], outline='')
+
+        # Vị trí hộp -> item trên canvas; người chơi là một item duy nhất
+        self.box_items = {}
+        self.player_item = self.canvas.create_oval(*self.cell_bounds(*self.state.player, 10),
+                                                   fill=COLORS['player'], outline='black')
+
+    def update_dynamic(self):
+        """Đồng bộ item hộp / người chơi với self.state, chỉ chạm vào các item đã đổi chỗ"""
+        boxes = self.state.boxes
+        # Hộp đã rời chỗ cũ được dời tới chỗ mới (một lần đẩy chỉ dời một item)
+        vacated = [pos for pos in self.box_items if pos not in boxes]
+        arrived = [pos for pos in boxes if pos not in self.box_items]
+        for pos in vacated[len(arrived):]:
+            self.canvas.delete(self.box_items.pop(pos))
+        for old, pos in zip(vacated, arrived):
+            item = self.box_items.pop(old)
+            self.canvas.coords(item, *self.cell_bounds(*pos, 6))
+            self.canvas.itemconfig(item, fill=self.box_color(pos))
+            self.box_items[pos] = item
+        for pos in arrived[len(vacated):]:
+            self.box_items[pos] = self.canvas.create_rectangle(*self.cell_bounds(*pos, 6),
+                                                               fill=self.box_color(pos), outline='black')
+
+        player = self.state.player
+        self.canvas.coords(self.player_item, *self.cell_bounds(*player, 10))
+        self.canvas.itemconfig(self.player_item,
+                               fill=COLORS['player_on_goal'] if player in self.goals else COLORS['player'])
+
+    def box_color(self, pos):
+        """Màu hộp: đậm hơn khi nằm trên goal"""
+        return COLORS['box_on_goal'] if pos in self.goals else COLORS['box']
+
+    @staticmethod
+    def cell_bounds(c, r, pad):
+        """Tọa độ (x1, y1, x2, y2) của ô (c, r) thu vào pad pixel mỗi cạnh"""
+        x1 = c * CELL_SIZE
+        y1 = r * CELL_SIZE
+        return x1 + pad, y1 + pad, x1 + CELL_SIZE - pad, y1 + CELL_SIZE - pad
 
     def on_canvas_click(self, event):
         """Xử lý click trên canvas: di chuyển đến ô được click nếu liền kề"""
@@ -530,6 +685,8 @@ class SokobanUI:
 
     def move(self, dx, dy):
         """Thực hiện di chuyển sử dụng logic game gốc"""
+        if self.busy:
+            return  # Animate phát lại bước đi tương đối, không được đổi trạng thái giữa chừng
         px, py = self.state.player
         new_p = (px + dx, py + dy)  # Vị trí mới của người chơi
 
@@ -566,88 +723,201 @@ class SokobanUI:
 
     def reset_level(self):
         """Reset về trạng thái ban đầu của level"""
+        if self.busy:
+            return
         self.state = GameState(self.original_player, frozenset(self.original_boxes))
         self.move_count = 0
-        self.info_var.set('Moves: 0 | Memory: 0.0KB')  # Reset cả memory display
+        self.info_var.set('Moves: 0')
         self.draw_map()
 
     def start_auto_solve(self, method):
-        """Chạy solver trong thread riêng để không làm đơ UI"""
-        t = threading.Thread(target=self.auto_solve, args=(method,), daemon=True)
-        t.start()
-
-    def auto_solve(self, method):
-        """Gọi solver và animate kết quả trên UI thread"""
+        """
+        Chạy solver trong thread riêng để không làm đơ UI
+        Thread solver chỉ gọi Solver và gửi thông điệp vào self.progress (queue.Queue);
+        mọi thao tác Tk (label, messagebox, animate) chạy trên UI thread qua root.after
+        """
+        if self.busy:
+            return  # Đang giải hoặc đang animate, chờ xong hoặc hủy trước
         # Vô hiệu hóa điều khiển trong khi giải
         self.disable_controls()
 
+        # Đọc biến Tk trên UI thread trước khi giao cho thread solver
         start_state = GameState(self.state.player, self.state.boxes)
         goal = frozenset(self.goals)
+        push = self.push_var.get()
+        heuristic = 'matching' if self.matching_var.get() else 'manhattan'
+        macros = push and self.macro_var.get()
+        suffix = '-macro' if macros else ''
+        # Tên cấu hình trong cache lời giải (giống tên phương pháp của batch_solver.py)
+        if method == 'bfs':
+            cache_name = ('bfs-push' if push else 'bfs') + suffix
+            solve = lambda: self.solver.bfs(start_state, goal, push=push, macros=macros)
+        elif method == 'bidir':
+            cache_name = 'bidirectional'
+            solve = lambda: self.solver.bidirectional(start_state, goal)
+        elif method == 'idastar':
+            cache_name = 'idastar'
+            solve = lambda: self.solver.dfs(start_state, goal)
+        elif method == 'race':
+            cache_name = 'race'
+            solve = lambda: self.solver.race(start_state, goal)
+        elif method == 'anytime':
+            cache_name = 'astar-anytime'
+            # Mỗi lời giải tốt hơn được gửi về UI thread ngay khi tìm được
+            solve = lambda: self.solver.anytime_a_star(
+                start_state, goal, on_solution=lambda moves, cost, weight: self.progress.put(
+                    ('solution', moves, cost, weight)))
+        else:
+            cache_name = 'astar' + ('-push' if push else '') + ('-matching' if heuristic == 'matching' else '') + suffix
+            solve = lambda: self.solver.a_star(start_state, goal, push=push, heuristic=heuristic, macros=macros)
+
+        # Mỗi lần giải có cờ hủy riêng và trần bộ nhớ, solver tự dừng khi vượt
+        self.cancel_token = CancelToken()
+        self.solver.budget = Budget(memory_limit_kb=SOLVER_MEMORY_LIMIT_KB, cancel=self.cancel_token)
+        # Solver gửi ảnh chụp tiến độ sau mỗi PROGRESS_INTERVAL nút mở rộng
+        self.solver.instrument(callback=lambda stats: self.progress.put(('progress', stats.snapshot())),
+                               interval=PROGRESS_INTERVAL)
+        self.btn_cancel.config(state='normal')
+        self.progress_var.set(f'{method.upper()}: starting...')
+
+        t = threading.Thread(target=self.auto_solve, args=(method, cache_name, start_state, goal, solve),
+                             daemon=True)
+        t.start()
+        self.root.after(PROGRESS_POLL_MS, self.poll_progress)
+
+    def cancel_solve(self):
+        """Yêu cầu solver đang chạy dừng ở lần kiểm tra ngân sách kế tiếp"""
+        if self.cancel_token is not None:
+            self.cancel_token.cancel()
+            self.progress_var.set('Cancelling...')
 
-        # Đo thời gian và bộ nhớ
+    def auto_solve(self, method, cache_name, start_state, goal, solve):
+        """Chạy trên thread solver: giải rồi gửi ('done', ...) về UI thread, không chạm vào Tk"""
+        # Đo thời gian; bộ nhớ lấy theo RSS đỉnh của tiến trình (không dùng tracemalloc vì làm chậm tìm kiếm)
         start_time = time.time()
-        tracemalloc.start()  # Bắt đầu đo bộ nhớ
-        path = []
+        moves, error = None, None
         try:
-            if method == 'bfs':
-                path = self.solver.bfs(start_state, goal)
-            else:
-                path = self.solver.a_star(start_state, goal)
+            moves = self.solver.solve_cached(cache_name, start_state, goal, solve)
         except Exception as e:
-            messagebox.showerror('Solver error', str(e))
-        
-        end_time = time.time()
-        current_memory, peak_memory = tracemalloc.get_traced_memory()  # Lấy thông tin bộ nhớ
-        tracemalloc.stop()  # Dừng đo bộ nhớ
+            error = str(e)
+        self.progress.put(('done', method, moves, error, time.time() - start_time, peak_rss_kb()))
+
+    def poll_progress(self):
+        """Chạy trên UI thread: lấy hết thông điệp trong hàng đợi, hiển thị tiến độ mới nhất"""
+        latest = None
+        while True:
+            try:
+                message = self.progress.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == 'done':
+                self.finish_solve(*message[1:])
+                return
+            if message[0] == 'solution':
+                _, moves, cost, weight = message
+                self.best_text = f' | best: {cost} pushes, {len(moves)} moves (w={weight})'
+                self.progress_var.set(f'ANYTIME{self.best_text}')
+                continue
+            latest = message[1]
+        if latest is not None:
+            best = f" | best f: {latest['best_f']}" if latest['best_f'] is not None else ''
+            self.progress_var.set(f"Expanded: {latest['expanded']:,} | Frontier: {latest['frontier']:,}"
+                                  f"{best} | {latest['rate']:,.0f} nodes/s | {latest['elapsed']:.1f}s"
+                                  f"{self.best_text}")
+        self.root.after(PROGRESS_POLL_MS, self.poll_progress)
+
+    def finish_solve(self, method, moves, error, elapsed, peak):
+        """Chạy trên UI thread: báo kết quả rồi animate lời giải"""
+        self.cancel_token = None
+        self.best_text = ''
+        self.btn_cancel.config(state='disabled')
+        self.solver.instrument()
+        peak_text = f'{peak} KB' if peak is not None else 'n/a'
+        expanded = self.solver.stats.expanded if self.solver.stats is not None else 0
+        self.progress_var.set(f'{method.upper()}: {expanded:,} nodes in {elapsed:.2f}s')
 
         # Xử lý kết quả
-        if not path:
+        if error is not None:
+            messagebox.showerror('Solver error', error)
+            self.enable_controls()
+            return
+        if self.solver.exceeded is not None and moves is None:
+            messagebox.showinfo('Search stopped',
+                            f'{method.upper()} stopped: {self.solver.exceeded}\n'
+                            f'Time: {elapsed:.2f}s\n'
+                            f'Nodes expanded: {expanded}\n'
+                            f'Peak RSS: {peak_text}')
+            self.enable_controls()
+            return
+        if moves is None:
             messagebox.showinfo('No solution', 
                             f'No solution found by {method.upper()}\n'
-                            f'Time: {end_time - start_time:.2f}s\n'
-                            f'Memory used: {current_memory / 1024:.2f} KB\n'
-                            f'Peak memory: {peak_memory / 1024:.2f} KB')
+                            f'Time: {elapsed:.2f}s\n'
+                            f'Nodes expanded: {expanded}\n'
+                            f'Peak RSS: {peak_text}')
             self.enable_controls()
             return
 
-        # Cập nhật label với thông tin memory
-        self.info_var.set(f'Moves: {self.move_count} | Memory: {current_memory/1024:.1f}KB')
-
-        # Animate đường đi (bỏ qua state đầu vì là state hiện tại)
-        for i, state in enumerate(path[1:]):
-            # Cập nhật UI trên main thread
-            self.state = state
-            self.move_count += 1
-            # Cập nhật thông tin memory trong quá trình animate
-            self.root.after(0, lambda: self.info_var.set(
-                f'Moves: {self.move_count} | Memory: {current_memory/1024:.1f}KB (Peak: {peak_memory/1024:.1f}KB)'
-            ))
-            self.root.after(0, self.draw_map)
-            time.sleep(0.12)  # Delay để có hiệu ứng animation
-
-        self.enable_controls()
-        messagebox.showinfo('Solved', 
-                        f'Solution applied!\n'
-                        f'Moves executed: {len(path)-1}\n'
-                        f'Solver time: {end_time - start_time:.2f}s\n'
-                        f'Memory used: {current_memory / 1024:.2f} KB\n'
-                        f'Peak memory: {peak_memory / 1024:.2f} KB')
+        winner = ''
+        if self.solver.cache_hit:
+            winner = 'Loaded from solution cache\n'
+        elif method == 'race':
+            result = self.solver.race_result
+            winner = f'Winner: {result.method} ({result.quality()})\n'
+        elif method == 'anytime':
+            # Anytime A* bị dừng vẫn trả về lời giải tốt nhất đã tìm được
+            if self.solver.exceeded is not None:
+                winner = f'Stopped ({self.solver.exceeded}): best solution so far\n'
+            else:
+                winner = 'Proven optimal (pushes)\n'
+        summary = (f'Solution applied!\n'
+                   f'{winner}'
+                   f'Moves executed: {len(moves)}\n'
+                   f'Solver time: {elapsed:.2f}s\n'
+                   f'Nodes expanded: {expanded}\n'
+                   f'Peak RSS: {peak_text}')
+        # Animate trực tiếp từ chuỗi di chuyển, mỗi bước chỉ tạo một GameState
+        self.animate_path(moves, 0, peak_text, summary)
+
+    def animate_path(self, moves, index, peak_text, summary):
+        """Animate bước moves[index] rồi hẹn bước kế tiếp bằng root.after (không time.sleep trong thread)"""
+        if index == len(moves):
+            self.enable_controls()
+            messagebox.showinfo('Solved', summary)
+            return
+        dx, dy = MOVE_DELTAS[moves[index]]
+        player = (self.state.player[0] + dx, self.state.player[1] + dy)
+        boxes = self.state.boxes
+        if player in boxes:
+            boxes = (boxes - {player}) | {(player[0] + dx, player[1] + dy)}
+        self.state = GameState(player, boxes)
+        self.move_count += 1
+        self.draw_map()
+        # Cập nhật thông tin trong quá trình animate
+        self.info_var.set(f'Moves: {self.move_count} | Peak RSS: {peak_text}')
+        self.root.after(ANIMATION_DELAY_MS, self.animate_path, moves, index + 1, peak_text, summary)
 
     def disable_controls(self):
         """Vô hiệu hóa điều khiển trong khi solver đang chạy"""
+        self.busy = True
         self.root.unbind('<Up>')
         self.root.unbind('<Down>')
         self.root.unbind('<Left>')
         self.root.unbind('<Right>')
         self.canvas.unbind('<Button-1>')
+        for button in self.control_buttons:
+            button.config(state='disabled')
 
     def enable_controls(self):
         """Bật lại điều khiển sau khi solver hoàn thành"""
+        self.busy = False
         self.root.bind('<Up>', lambda e: self.move(0, -1))
         self.root.bind('<Down>', lambda e: self.move(0, 1))
         self.root.bind('<Left>', lambda e: self.move(-1, 0))
         self.root.bind('<Right>', lambda e: self.move(1, 0))
         self.canvas.bind('<Button-1>', self.on_canvas_click)
+        for button in self.control_buttons:
+            button.config(state='normal')
 
 # ----------------------- Main entry -----------------------
 
@@ -0,0 +1,98 @@
+"""
+Bộ nhớ đệm lời giải lưu trên đĩa (sqlite)
+
+Khóa = SHA-256 của bản đồ đã chuẩn hóa, tập goal, trạng thái đầu và tên phương pháp
+(các phương pháp khác nhau cho lời giải tối ưu theo tiêu chí khác nhau).
+Giá trị = chuỗi di chuyển (NULL nếu đã chứng minh không có lời giải) và thống kê dạng JSON.
+Khi tổng kích thước vượt max_bytes, các mục lâu không dùng nhất bị xóa (LRU).
+
+Mỗi thao tác mở một kết nối riêng, nên dùng được từ thread giải của UI.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "sokoban", "solutions.sqlite")
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+def make_key(base_map, goals, player, boxes, method):
+    """
+    Khóa của một lần giải
+    Bản đồ được chuẩn hóa: bỏ khoảng trắng cuối mỗi dòng và các dòng trống ở cuối
+    """
+    rows = ["".join(row).rstrip() for row in base_map]
+    while rows and not rows[-1]:
+        rows.pop()
+    text = "\n".join([
+        "\n".join(rows),
+        repr(sorted(goals)),
+        repr(tuple(player)),
+        repr(sorted(boxes)),
+        method,
+    ])
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class SolutionCache:
+    """Bảng key -> (chuỗi di chuyển, thống kê) trong một file sqlite, giới hạn theo kích thước"""
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS solutions ("
+                " key TEXT PRIMARY KEY, moves TEXT, stats TEXT NOT NULL,"
+                " size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Kết nối trong một giao dịch, tự commit và đóng"""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """Trả về (chuỗi di chuyển hoặc None, dict thống kê) hoặc None nếu chưa có"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT moves, stats FROM solutions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE solutions SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row[0], json.loads(row[1])
+
+    def put(self, key, moves, stats):
+        """Lưu lời giải rồi xóa các mục cũ nhất nếu vượt giới hạn kích thước"""
+        stats_text = json.dumps(stats)
+        size = len(key) + len(moves or "") + len(stats_text)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO solutions (key, moves, stats, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, moves, stats_text, size, time.time()),
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM solutions").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = conn.execute("SELECT key, size FROM solutions ORDER BY last_used").fetchall()
+            for old_key, old_size in rows:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM solutions WHERE key = ?", (old_key,))
+                total -= old_size
+
+    def clear(self):
+        """Xóa toàn bộ cache"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM solutions")
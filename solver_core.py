@@ -0,0 +1,539 @@
+"""
+Lõi tìm kiếm dùng chung cho BFS_and_heuristic.py (CLI) và sokoban_solver.py (UI)
+
+Trạng thái gọn (CompactState):
+- Người chơi là chỉ số ô trên bản đồ đã làm phẳng (xem level_analysis.Level)
+- Tập hộp là một số nguyên Python dùng như bitboard
+- Khóa băm Zobrist được cập nhật tăng dần, không băm lại toàn bộ tập hộp
+
+Tìm kiếm theo mức đẩy hộp (push-level search):
+- Một trạng thái là (tập hộp, vùng người chơi) - vùng được chuẩn hóa bằng
+  ô nhỏ nhất mà người chơi đi tới được (flood fill), nên mọi vị trí người chơi
+  trong cùng một vùng chỉ được lưu một lần
+- Trạng thái con chỉ sinh ra bởi các lần đẩy hộp
+- Các bước đi bộ của người chơi chỉ được điền lại khi dựng lời giải,
+  kết quả vẫn là chuỗi di chuyển đầy đủ (U, D, L, R)
+"""
+import heapq
+from array import array
+from collections import deque
+
+from corral import pi_corral
+from deadlock import is_freeze_deadlock
+from heuristics import ManhattanHeuristic, MatchingHeuristic
+from level_analysis import LETTERS, iter_bits
+from bucket_queue import BucketQueue
+from search_record import SearchRecord
+from search_stats import SearchStats
+
+# 4 hướng di chuyển: Lên, Xuống, Trái, Phải (dx, dy, ký tự)
+MOVES = ((0, -1, "U"), (0, 1, "D"), (-1, 0, "L"), (1, 0, "R"))
+
+# Các weight của anytime_a_star, lần cuối luôn là 1 (A* thường)
+ANYTIME_WEIGHTS = (5, 3, 2, 1.5, 1)
+
+
+class CompactState:
+    """
+    Trạng thái gọn dùng trong lúc tìm kiếm
+    __slots__ để mỗi trạng thái chỉ tốn vài con trỏ, không có __dict__
+    """
+    __slots__ = ("player", "boxes", "zhash", "cost", "heuristic", "hdata")
+
+    def __init__(self, player, boxes, zhash, cost=0, heuristic=0):
+        self.player = player  # Chỉ số ô của người chơi
+        self.boxes = boxes  # Bitboard các hộp
+        self.zhash = zhash  # Khóa Zobrist của (player, boxes)
+        self.cost = cost  # g(n)
+        self.heuristic = heuristic  # h(n)
+        self.hdata = None  # Thành phần heuristic để trạng thái con kế thừa
+
+    def __eq__(self, other):
+        """Hai trạng thái bằng nhau nếu người chơi và bitboard hộp giống nhau"""
+        return self.player == other.player and self.boxes == other.boxes
+
+    def __hash__(self):
+        """Dùng luôn khóa Zobrist đã tính sẵn"""
+        return self.zhash
+
+    def __lt__(self, other):
+        """So sánh nhỏ hơn: dùng cho hàng đợi ưu tiên trong A*"""
+        return (self.cost + self.heuristic) < (other.cost + other.heuristic)
+
+
+def make_state(level, player, boxes, push=False):
+    """
+    Tạo CompactState từ vị trí người chơi (x, y) và tập hộp (x, y)
+    push=True: chuẩn hóa người chơi về ô nhỏ nhất trong vùng đi tới được
+    """
+    player = level.index(player)
+    mask = level.box_mask(boxes)
+    if push:
+        _, player = reachable(level, mask, player)
+    return CompactState(player, mask, level.zobrist(player, mask))
+
+
+def reachable(level, boxes, player):
+    """
+    Flood fill từ vị trí người chơi
+    Trả về (mảng đánh dấu các ô đi tới được, ô nhỏ nhất trong vùng)
+    """
+    walls = level.walls
+    offsets = level.offsets
+    seen = bytearray(level.size)
+    seen[player] = 1
+    lowest = player
+    stack = [player]
+    while stack:
+        cell = stack.pop()
+        for off in offsets:
+            nxt = cell + off
+            if seen[nxt] or walls[nxt] or boxes >> nxt & 1:
+                continue
+            seen[nxt] = 1
+            if nxt < lowest:
+                lowest = nxt
+            stack.append(nxt)
+    return seen, lowest
+
+
+def move_successors(level, state):
+    """
+    Sinh trạng thái con theo từng bước đi của người chơi
+    Trả về danh sách (hướng, trạng thái con)
+    """
+    walls = level.walls
+    dead = level.dead
+    box_keys = level.box_keys
+    player_keys = level.player_keys
+    player = state.player
+    children = []
+    for d, off in enumerate(level.offsets):
+        nxt = player + off
+        if walls[nxt]:
+            continue
+        boxes = state.boxes
+        zhash = state.zhash ^ player_keys[player] ^ player_keys[nxt]
+        if boxes >> nxt & 1:
+            # Đẩy hộp: ô phía sau hộp phải trống và không phải ô chết
+            target = nxt + off
+            if walls[target] or dead[target] or boxes >> target & 1:
+                continue
+            boxes ^= (1 << nxt) | (1 << target)
+            # Bỏ luôn lần đẩy làm hộp bị đóng băng ngoài goal
+            if is_freeze_deadlock(level, boxes, target):
+                continue
+            zhash ^= box_keys[nxt] ^ box_keys[target]
+        children.append((d, CompactState(nxt, boxes, zhash, state.cost + 1)))
+    return children
+
+
+def push_successors(level, state):
+    """
+    Sinh các trạng thái con bằng cách đẩy hộp
+    Khi có PI-corral (corral.py) chỉ sinh các lần đẩy hộp rào của corral đó
+    Trả về danh sách (lần đẩy, trạng thái con) với lần đẩy = (ô hộp, hướng)
+    """
+    walls = level.walls
+    dead = level.dead
+    box_keys = level.box_keys
+    player_keys = level.player_keys
+    boxes = state.boxes
+    seen, _ = reachable(level, boxes, state.player)
+    children = []
+    for box in iter_bits(pi_corral(level, boxes, seen) or boxes):
+        for d, off in enumerate(level.offsets):
+            # Người chơi phải đứng phía sau hộp
+            if not seen[box - off]:
+                continue
+            target = box + off
+            # Ô đích của hộp không được là tường, ô chết hoặc hộp khác
+            if walls[target] or dead[target] or boxes >> target & 1:
+                continue
+            new_boxes = boxes ^ (1 << box) ^ (1 << target)
+            # Bỏ luôn lần đẩy làm hộp bị đóng băng ngoài goal
+            if is_freeze_deadlock(level, new_boxes, target):
+                continue
+            # Sau khi đẩy, người chơi đứng ở vị trí cũ của hộp
+            _, player = reachable(level, new_boxes, box)
+            zhash = (state.zhash ^ box_keys[box] ^ box_keys[target]
+                     ^ player_keys[state.player] ^ player_keys[player])
+            children.append(((box, d), CompactState(player, new_boxes, zhash, state.cost + 1)))
+    return children
+
+
+def macro_push_successors(level, state):
+    """
+    Như push_successors nhưng gộp các chuỗi lần đẩy bắt buộc thành một bước (macro move,
+    bảng tĩnh trong level_analysis.MacroTables):
+    - Đường hầm: hộp bị đẩy vào hành lang rộng 1 ô thì được đẩy tiếp cùng hướng tới khi ra
+      khỏi đường hầm, gặp goal hoặc bị chặn
+    - Phòng goal: hộp được đẩy từ ô cửa vào phòng đang được lấp đúng thứ tự thì được đẩy
+      thẳng tới goal kế tiếp theo đường đã tính sẵn
+    Trả về danh sách (hành động, trạng thái con); hành động là (ô hộp, hướng) hoặc tuple
+    các lần đẩy khi là macro, child.cost = state.cost + số lần đẩy
+    """
+    tables = level.macro_tables()
+    tunnels, rooms = tables.tunnels, tables.rooms
+    walls = level.walls
+    dead = level.dead
+    offsets = level.offsets
+    children = []
+    for push, child in push_successors(level, state):
+        box, d = push
+        off = offsets[d]
+        target = box + off
+        boxes = child.boxes
+        pushes = [push]
+        tunnel = tunnels[d]
+        while tunnel[target]:
+            nxt = target + off
+            if walls[nxt] or dead[nxt] or boxes >> nxt & 1:
+                break
+            boxes ^= (1 << target) | (1 << nxt)
+            pushes.append((target, d))
+            target = nxt
+        room = rooms.get((target, d))
+        if room is not None:
+            mask, prefixes, routes = room
+            filled = (boxes & mask) ^ (1 << target)
+            k = bin(filled).count("1")
+            if k < len(prefixes) and prefixes[k] == filled:
+                route = routes[k]
+                goal = route[-1][0] + offsets[route[-1][1]]
+                boxes ^= (1 << target) | (1 << goal)
+                pushes.extend(route[1:])
+                target = goal
+        if len(pushes) == 1:
+            children.append((push, child))
+            continue
+        if is_freeze_deadlock(level, boxes, target):
+            continue
+        # Người chơi đứng ở ô hộp vừa rời trong lần đẩy cuối
+        _, player = reachable(level, boxes, pushes[-1][0])
+        zhash = (state.zhash ^ level.box_keys[box] ^ level.box_keys[target]
+                 ^ level.player_keys[state.player] ^ level.player_keys[player])
+        children.append((tuple(pushes), CompactState(player, boxes, zhash, state.cost + len(pushes))))
+    return children
+
+
+def walk_moves(level, boxes, start, target):
+    """
+    Tìm đường đi bộ ngắn nhất (không đẩy hộp) từ start đến target
+    Trả về chuỗi di chuyển hoặc None nếu không đi được
+    """
+    if start == target:
+        return ""
+    walls = level.walls
+    parents = {start: None}
+    q = deque([start])
+    while q:
+        cell = q.popleft()
+        for d, off in enumerate(level.offsets):
+            nxt = cell + off
+            if nxt in parents or walls[nxt] or boxes >> nxt & 1:
+                continue
+            parents[nxt] = (cell, d)
+            if nxt == target:
+                # Truy vết đường đi từ target về start
+                letters = []
+                while parents[nxt] is not None:
+                    nxt, d = parents[nxt]
+                    letters.append(LETTERS[d])
+                letters.reverse()
+                return "".join(letters)
+            q.append(nxt)
+    return None
+
+
+def pushes_to_moves(level, player, boxes, pushes):
+    """
+    Điền lại các bước đi bộ giữa những lần đẩy
+    player, boxes: chỉ số ô thật của người chơi và bitboard hộp ban đầu
+    Trả về chuỗi di chuyển đầy đủ
+    """
+    moves = []
+    for box, d in pushes:
+        off = level.offsets[d]
+        # Đi bộ đến ô phía sau hộp rồi đẩy
+        moves.append(walk_moves(level, boxes, player, box - off))
+        moves.append(LETTERS[d])
+        boxes ^= (1 << box) | (1 << (box + off))
+        player = box
+    return "".join(moves)
+
+
+def replay_moves(player, boxes, moves):
+    """
+    Thực hiện lần lượt chuỗi di chuyển
+    Trả về danh sách (người chơi, tập hộp) cho từng bước, kể cả trạng thái đầu
+    """
+    deltas = {letter: (dx, dy) for dx, dy, letter in MOVES}
+    boxes = frozenset(boxes)
+    steps = [(player, boxes)]
+    for letter in moves:
+        dx, dy = deltas[letter]
+        player = (player[0] + dx, player[1] + dy)
+        if player in boxes:
+            boxes = (boxes - {player}) | {(player[0] + dx, player[1] + dy)}
+        steps.append((player, boxes))
+    return steps
+
+
+def count_pushes(player, boxes, moves):
+    """Số lần đẩy hộp trong chuỗi di chuyển, player / boxes là vị trí (x, y) ban đầu"""
+    deltas = {letter: (dx, dy) for dx, dy, letter in MOVES}
+    boxes = set(boxes)
+    x, y = player
+    pushes = 0
+    for letter in moves:
+        dx, dy = deltas[letter]
+        x, y = x + dx, y + dy
+        if (x, y) in boxes:
+            boxes.remove((x, y))
+            boxes.add((x + dx, y + dy))
+            pushes += 1
+    return pushes
+
+
+def _successor_function(push, macros):
+    """Hàm sinh trạng thái con theo chế độ tìm kiếm"""
+    if macros:
+        if not push:
+            raise ValueError("macro moves require push-level search (push=True)")
+        return macro_push_successors
+    return push_successors if push else move_successors
+
+
+def rebuild_moves(level, record, sid, start_player, start_boxes):
+    """
+    Truy vết các hành động từ trạng thái sid về trạng thái đầu (search_record.SearchRecord)
+    Trả về chuỗi di chuyển đầy đủ
+    """
+    if record.push:
+        return pushes_to_moves(level, start_player, start_boxes, record.pushes(sid))
+    return record.moves(sid)
+
+
+def bfs(level, player, boxes, push=False, stats=None, macros=False):
+    """
+    BFS trên trạng thái gọn
+    push=False: theo từng bước đi (ít bước nhất)
+    push=True: theo từng lần đẩy hộp (ít lần đẩy nhất)
+    macros=True (cần push=True): dùng macro move (macro_push_successors), mỗi lớp là một
+    quyết định nên lời giải không còn đảm bảo ít lần đẩy nhất
+    stats: SearchStats (search_stats.py) nhận bộ đếm, thời gian và báo cáo tiến độ
+    Trạng thái đã thăm lưu trong SearchRecord (id nguyên, cha / hành động trong mảng)
+    Trả về chuỗi di chuyển hoặc None
+    """
+    stats = stats or SearchStats()
+    start = make_state(level, player, boxes, push)
+    successors = stats.timed("successors", _successor_function(push, macros))
+    rebuild = stats.timed("rebuild", rebuild_moves)
+    record = SearchRecord(level, push)
+    ids, parents, actions, shift, encode = record.ids, record.parents, record.actions, record.shift, record.encode
+    q = deque([(start, record.add_root(start))])
+    generated = stats.generated
+
+    try:
+        while q:
+            state, sid = q.popleft()
+            stats.pops += 1
+            if state.boxes == level.goal_mask:
+                return rebuild(level, record, sid, level.index(player), start.boxes)
+            stats.expanded += 1
+            if stats.expanded >= stats.report_at:
+                stats.report(len(q), state.cost)
+
+            children = successors(level, state)
+            stats.generated += len(children)
+            for action, child in children:
+                key = child.boxes << shift | child.player
+                if key not in ids:
+                    child_id = ids[key] = len(parents)
+                    parents.append(sid)
+                    actions.append(encode(action))
+                    q.append((child, child_id))
+    finally:
+        # Không đếm trong vòng lặp con: mỗi trạng thái đã ghi vào hàng đợi đúng một lần,
+        # mọi trạng thái con còn lại là trùng lặp
+        stats.pushes += len(parents)
+        stats.duplicates += stats.generated - generated - (len(parents) - 1)
+
+    return None
+
+
+def a_star(level, player, boxes, push=False, heuristic=None, stats=None, macros=False, weight=1, bound=None):
+    """
+    A* trên trạng thái gọn, g(n) = số bước (hoặc số lần đẩy nếu push=True)
+    heuristic: đối tượng trong heuristics.py (mặc định ManhattanHeuristic),
+    được tính tăng dần từ trạng thái cha; trạng thái có heuristic vô cùng
+    (deadlock) bị bỏ qua
+    stats: SearchStats (search_stats.py) nhận bộ đếm, thời gian và báo cáo tiến độ
+    macros=True (cần push=True): dùng macro move (macro_push_successors), g tăng đúng số
+    lần đẩy của macro; macro có thể bỏ qua lời giải tối ưu trong vài trường hợp hiếm
+    weight: weighted A*, sắp open list theo g + weight * h; weight > 1 tìm ra lời giải
+    nhanh hơn nhưng dài hơn lời giải tối ưu tối đa weight lần (khi h admissible)
+    bound: chỉ tìm lời giải có chi phí < bound, con có g + h >= bound bị bỏ
+    (dùng cho anytime_a_star)
+    Open list là BucketQueue theo f nguyên = (g + weight * h) * heuristic.SCALE, cùng f thì g lớn
+    (h nhỏ) trước; bản cũ của trạng thái đã được cải thiện bị bỏ qua khi lấy ra
+    g tốt nhất lưu theo id của SearchRecord trong array('I'), cha / hành động được
+    ghi đè khi tìm được đường tốt hơn tới trạng thái đã thăm
+    Trả về chuỗi di chuyển hoặc None
+    """
+    stats = stats or SearchStats()
+    heuristic = heuristic or ManhattanHeuristic()
+    successors = stats.timed("successors", _successor_function(push, macros))
+    evaluate = stats.timed("heuristic", heuristic.evaluate)
+    update = stats.timed("heuristic", heuristic.update)
+    scale = heuristic.SCALE
+    open_set = BucketQueue()
+    open_push = stats.timed("open_push", open_set.push)
+    open_pop = stats.timed("open_pop", open_set.pop)
+    rebuild = stats.timed("rebuild", rebuild_moves)
+
+    start = make_state(level, player, boxes, push)
+    start.heuristic = evaluate(level, start)
+    record = SearchRecord(level, push)
+    ids, parents, actions, shift, encode = record.ids, record.parents, record.actions, record.shift, record.encode
+    g_score = array("I", [0])
+    if start.heuristic == float("inf"):
+        return None
+    # Phần tử open list: (trạng thái, id)
+    open_push(int(weight * start.heuristic * scale + 0.5), 0, (start, record.add_root(start)))
+    # Bộ đếm theo từng trạng thái con giữ ở biến cục bộ, ghi vào stats khi kết thúc
+    pushes, duplicates = 1, 0
+
+    try:
+        while open_set:
+            f, (current, sid) = open_pop()
+            stats.pops += 1
+            # Bỏ qua bản cũ của trạng thái đã tìm được đường tốt hơn
+            if current.cost > g_score[sid]:
+                continue
+            if current.boxes == level.goal_mask:
+                return rebuild(level, record, sid, level.index(player), start.boxes)
+            stats.expanded += 1
+            if stats.expanded >= stats.report_at:
+                stats.report(len(open_set), f / scale)
+
+            children = successors(level, current)
+            stats.generated += len(children)
+            for action, child in children:
+                # Hàm sinh con đã đặt child.cost = g của cha + chi phí hành động
+                tentative_g_score = child.cost
+                key = child.boxes << shift | child.player
+                child_id = ids.get(key)
+                if child_id is None or tentative_g_score < g_score[child_id]:
+                    child.heuristic = update(level, current, child)
+                    if child.heuristic == float("inf"):
+                        continue
+                    if bound is not None and tentative_g_score + child.heuristic >= bound:
+                        continue
+                    code = encode(action)
+                    if child_id is None:
+                        child_id = ids[key] = len(parents)
+                        parents.append(sid)
+                        actions.append(code)
+                        g_score.append(tentative_g_score)
+                    else:
+                        parents[child_id] = sid
+                        actions[child_id] = code
+                        g_score[child_id] = tentative_g_score
+                    open_push(int((tentative_g_score + weight * child.heuristic) * scale + 0.5), tentative_g_score,
+                              (child, child_id))
+                    pushes += 1
+                else:
+                    duplicates += 1
+            # Các con đã kế thừa xong, giải phóng thành phần heuristic của trạng thái cha
+            current.hdata = None
+    finally:
+        stats.pushes += pushes
+        stats.duplicates += duplicates
+
+    return None
+
+
+def anytime_a_star(level, player, boxes, push=True, heuristic=None, stats=None, weights=ANYTIME_WEIGHTS):
+    """
+    Anytime A* kiểu restarting weighted A*: chạy a_star lần lượt với các weight giảm dần,
+    mỗi lần chỉ tìm lời giải ngắn hơn lời giải tốt nhất đã có (bound)
+    Generator, sinh (chuỗi di chuyển, chi phí, weight) mỗi khi tìm được lời giải tốt hơn;
+    chi phí là số lần đẩy (push=True) hoặc số bước
+    heuristic: mặc định MatchingHeuristic - admissible cho cả số lần đẩy và số bước, nên
+    khi generator chạy hết (lần cuối weight 1 không tìm được lời giải ngắn hơn) thì lời giải
+    cuối cùng đã được chứng minh tối ưu; dừng sớm nếu chi phí bằng heuristic của trạng thái đầu
+    Cùng một stats cho mọi lần chạy: bộ đếm cộng dồn, ngân sách tính cho cả quá trình;
+    BudgetExceeded (search_stats.py) được ném ra khỏi generator, các lời giải đã sinh vẫn dùng được
+    """
+    stats = stats or SearchStats()
+    heuristic = heuristic or MatchingHeuristic()
+    lower = heuristic.evaluate(level, make_state(level, player, boxes, push))
+    best = None
+    for weight in weights:
+        moves = a_star(level, player, boxes, push, heuristic, stats, weight=weight, bound=best)
+        if moves is None:
+            if best is None:
+                return  # Đã duyệt hết mà không có lời giải
+            continue
+        best = count_pushes(player, boxes, moves) if push else len(moves)
+        yield moves, best, weight
+        if best <= lower:
+            return
+
+
+def greedy(level, player, boxes, push=False, heuristic=None, stats=None):
+    """
+    Greedy best-first: luôn mở rộng trạng thái có heuristic nhỏ nhất, bỏ qua g(n)
+    Thường tìm ra lời giải nhanh nhất nhưng không đảm bảo tối ưu
+    Mỗi trạng thái chỉ được đưa vào hàng đợi một lần
+    Trả về chuỗi di chuyển hoặc None
+    """
+    stats = stats or SearchStats()
+    heuristic = heuristic or ManhattanHeuristic()
+    successors = stats.timed("successors", push_successors if push else move_successors)
+    evaluate = stats.timed("heuristic", heuristic.evaluate)
+    update = stats.timed("heuristic", heuristic.update)
+    heappush = stats.timed("heap_push", heapq.heappush)
+    heappop = stats.timed("heap_pop", heapq.heappop)
+    rebuild = stats.timed("rebuild", rebuild_moves)
+
+    start = make_state(level, player, boxes, push)
+    start.heuristic = evaluate(level, start)
+    record = SearchRecord(level, push)
+    ids, parents, actions, shift, encode = record.ids, record.parents, record.actions, record.shift, record.encode
+    open_set = [(start.heuristic, start, record.add_root(start))]
+    pushes, duplicates = 1, 0
+
+    try:
+        while open_set:
+            h, current, sid = heappop(open_set)
+            stats.pops += 1
+            if current.boxes == level.goal_mask:
+                return rebuild(level, record, sid, level.index(player), start.boxes)
+            stats.expanded += 1
+            if stats.expanded >= stats.report_at:
+                stats.report(len(open_set), h)
+
+            children = successors(level, current)
+            stats.generated += len(children)
+            for action, child in children:
+                key = child.boxes << shift | child.player
+                if key in ids:
+                    duplicates += 1
+                    continue
+                child.heuristic = update(level, current, child)
+                if child.heuristic == float("inf"):
+                    continue
+                child_id = ids[key] = len(parents)
+                parents.append(sid)
+                actions.append(encode(action))
+                heappush(open_set, (child.heuristic, child, child_id))
+                pushes += 1
+            current.hdata = None
+    finally:
+        stats.pushes += pushes
+        stats.duplicates += duplicates
+
+    return None
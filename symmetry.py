@@ -0,0 +1,131 @@
+"""
+Chuẩn hóa level theo 8 phép đối xứng của hình vuông (nhóm dihedral D4)
+
+Một phép biến đổi là (flip_x, flip_y, transpose): lật ngang, lật dọc rồi
+(nếu transpose) đổi vai trò x và y. 8 tổ hợp cho đủ 4 phép quay và 4 phép lật.
+Hướng chuẩn của một level là hướng có chuỗi biểu diễn (bản đồ + goal + hộp +
+người chơi) nhỏ nhất theo thứ tự từ điển, nên các level là ảnh quay / lật của
+nhau có cùng dạng chuẩn và dùng chung được mục trong cache lời giải.
+Trước khi biến đổi, level được cắt về khung bao các ô tường (crop_level), nên khoảng
+trắng đệm quanh bản đồ (trở thành khoảng trắng đầu dòng sau khi lật / quay) không làm
+khác khóa. Cắt khung chỉ là phép tịnh tiến: tọa độ dịch đi một offset, còn chữ cái
+di chuyển (U/D/L/R) không đổi.
+Lời giải tìm trên dạng chuẩn được đổi ngược về hướng gốc bằng moves_from_canonical.
+"""
+from itertools import product
+
+# Vector hướng của các chữ cái di chuyển
+DIRECTIONS = {"U": (0, -1), "D": (0, 1), "L": (-1, 0), "R": (1, 0)}
+LETTER_OF = {vector: letter for letter, vector in DIRECTIONS.items()}
+
+# 8 phép biến đổi; (False, False, False) là phép đồng nhất
+TRANSFORMS = tuple(product((False, True), repeat=3))
+
+
+def _size(base_map):
+    """Kích thước (rộng, cao) của bản đồ, dòng ngắn được coi như có khoảng trắng ở cuối"""
+    return max((len(row) for row in base_map), default=0), len(base_map)
+
+
+def transform_point(point, transform, width, height):
+    """Ảnh của ô (x, y) trên bản đồ width x height"""
+    flip_x, flip_y, transpose = transform
+    x, y = point
+    if flip_x:
+        x = width - 1 - x
+    if flip_y:
+        y = height - 1 - y
+    return (y, x) if transpose else (x, y)
+
+
+def transform_vector(vector, transform):
+    """Ảnh của vector hướng (dx, dy)"""
+    flip_x, flip_y, transpose = transform
+    dx, dy = vector
+    if flip_x:
+        dx = -dx
+    if flip_y:
+        dy = -dy
+    return (dy, dx) if transpose else (dx, dy)
+
+
+def inverse_vector(vector, transform):
+    """Phép ngược của transform_vector: đổi trục trước rồi mới lật"""
+    flip_x, flip_y, transpose = transform
+    dx, dy = vector
+    if transpose:
+        dx, dy = dy, dx
+    return (-dx if flip_x else dx, -dy if flip_y else dy)
+
+
+def crop_level(base_map, goals, player, boxes):
+    """
+    Cắt level về khung bao các ô tường, dịch người chơi / hộp / goal theo
+    Trả về ((base_map, goals, player, boxes) đã cắt, offset (dx, dy) đã trừ khỏi tọa độ)
+    """
+    walls = [(x, y) for y, row in enumerate(base_map) for x, char in enumerate(row) if char == "#"]
+    if not walls:
+        return (base_map, goals, player, boxes), (0, 0)
+    left = min(x for x, _ in walls)
+    right = max(x for x, _ in walls) + 1
+    top = min(y for _, y in walls)
+    bottom = max(y for _, y in walls) + 1
+    cropped = ["".join(row[left:right]) for row in base_map[top:bottom]]
+
+    def shift(point):
+        return point[0] - left, point[1] - top
+
+    goals = frozenset(shift(g) for g in goals)
+    boxes = frozenset(shift(b) for b in boxes)
+    return (cropped, goals, shift(player), boxes), (left, top)
+
+
+def transform_level(base_map, goals, player, boxes, transform):
+    """Áp dụng transform lên cả level, trả về (base_map, goals, player, boxes) mới"""
+    width, height = _size(base_map)
+    new_width, new_height = (height, width) if transform[2] else (width, height)
+    grid = [[" "] * new_width for _ in range(new_height)]
+    for y, row in enumerate(base_map):
+        for x, char in enumerate(row):
+            nx, ny = transform_point((x, y), transform, width, height)
+            grid[ny][nx] = char
+    goals = frozenset(transform_point(g, transform, width, height) for g in goals)
+    boxes = frozenset(transform_point(b, transform, width, height) for b in boxes)
+    player = transform_point(player, transform, width, height)
+    return grid, goals, player, boxes
+
+
+def _render(base_map, goals, player, boxes):
+    """Chuỗi biểu diễn level dùng để so sánh các hướng"""
+    rows = ["".join(row).rstrip() for row in base_map]
+    return "\n".join(rows) + "|" + repr(sorted(goals)) + repr(sorted(boxes)) + repr(player)
+
+
+def canonicalize(base_map, goals, player, boxes):
+    """
+    Cắt level về khung bao tường rồi chọn hướng chuẩn trong 8 phép biến đổi
+    Trả về (transform, (base_map, goals, player, boxes) ở hướng chuẩn); tọa độ ở hướng
+    chuẩn là của level đã cắt (crop_level), chuỗi di chuyển chỉ cần đổi theo transform
+    """
+    cropped, _ = crop_level(base_map, goals, player, boxes)
+    best = None
+    for transform in TRANSFORMS:
+        level = transform_level(*cropped, transform)
+        text = _render(*level)
+        if best is None or text < best[0]:
+            best = (text, transform, level)
+    return best[1], best[2]
+
+
+def moves_to_canonical(moves, transform):
+    """Đổi chuỗi di chuyển ở hướng gốc sang hướng chuẩn"""
+    if moves is None:
+        return None
+    return "".join(LETTER_OF[transform_vector(DIRECTIONS[m], transform)] for m in moves)
+
+
+def moves_from_canonical(moves, transform):
+    """Đổi chuỗi di chuyển tìm được ở hướng chuẩn về hướng gốc"""
+    if moves is None:
+        return None
+    return "".join(LETTER_OF[inverse_vector(DIRECTIONS[m], transform)] for m in moves)